@@ -0,0 +1,65 @@
+# /benchmarks/_common.py
+#
+# Helpers shared by the benchmarks.
+#
+# See /LICENCE.md for Copyright information
+"""Helpers shared by the benchmarks."""
+
+import json
+
+import os
+
+import sys
+
+
+CHECKOUT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def checkout_environment():
+    """Get an environment for a fresh interpreter to sample in.
+
+    The checkout containing the benchmarks is put first on the path, so
+    that it is the version which gets measured.
+    """
+    environment = os.environ.copy()
+    environment["PYTHONPATH"] = os.pathsep.join(
+        [CHECKOUT] + [p for p in [environment.get("PYTHONPATH")] if p]
+    )
+    return environment
+
+
+def median(values):
+    """Get the median of values."""
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def add_output_arguments(parser):
+    """Add the --output and --compare arguments to parser."""
+    parser.add_argument("--output", default=None,
+                        help="""Write JSON results here, not stdout""")
+    parser.add_argument("--compare", default=None,
+                        help="""JSON results of a previous run to """
+                             """compare against""")
+
+
+def write_results(results, arguments, compare):
+    """Write results as JSON, as given by arguments.
+
+    If a previous run was passed with --compare, compare is called with
+    results and the previous results.
+    """
+    rendered = json.dumps(results, indent=2, sort_keys=True) + "\n"
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            output_file.write(rendered)
+    else:
+        sys.stdout.write(rendered)
+
+    if arguments.compare:
+        with open(arguments.compare) as previous_file:
+            compare(results, json.load(previous_file))
@@ -0,0 +1,99 @@
+# /benchmarks/benchmark_import.py
+#
+# Benchmark for the cost of importing polysquare_setuptools_lint.
+#
+# See /LICENCE.md for Copyright information
+"""Benchmark for the cost of importing polysquare_setuptools_lint.
+
+setup.py imports the module to register the command whichever command
+it runs, so this is paid by every setup.py invocation. Each sample
+imports setuptools first, as setup.py does, then times the import in a
+fresh interpreter and records which modules it loaded.
+"""
+
+import argparse
+
+import json
+
+import platform
+
+import subprocess
+
+import sys
+
+from _common import (add_output_arguments,
+                     checkout_environment,
+                     median,
+                     write_results)
+
+
+_SAMPLE_SCRIPT = """
+import json
+import sys
+import time
+import setuptools
+before = set(sys.modules.keys())
+start = time.time()
+import polysquare_setuptools_lint
+duration = time.time() - start
+sys.stdout.write(json.dumps({
+    "seconds": duration,
+    "modules": sorted(set(sys.modules.keys()) - before)
+}))
+"""
+
+
+def _sample():
+    """Time importing polysquare_setuptools_lint in a fresh interpreter.
+
+    Returns the duration and the modules which the import loaded.
+    """
+    output = subprocess.check_output([sys.executable, "-c", _SAMPLE_SCRIPT],
+                                     env=checkout_environment())
+    return json.loads(output.decode("utf-8"))
+
+
+def _compare(results, previous):
+    """Print how results compare to the previous results."""
+    sys.stderr.write("{0:<10} {1:>10} {2:>10}\n"
+                     "{3:<10} {4:>10.5f} {5:>10.5f}\n"
+                     "{6:<10} {7:>10} {8:>10}\n".format(
+                         "",
+                         "previous",
+                         "current",
+                         "seconds",
+                         previous["median"],
+                         results["median"],
+                         "modules",
+                         len(previous["modules"]),
+                         len(results["modules"])))
+
+
+def _parse_arguments(arguments):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="""Number of samples to take""")
+    add_output_arguments(parser)
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    """Time importing the module and write the results."""
+    arguments = _parse_arguments(arguments)
+
+    samples = [_sample() for _ in range(arguments.repeat)]
+    durations = [s["seconds"] for s in samples]
+    results = {
+        "python": "{0} {1}".format(platform.python_implementation(),
+                                   platform.python_version()),
+        "seconds": durations,
+        "median": median(durations),
+        "modules": samples[0]["modules"]
+    }
+
+    write_results(results, arguments, _compare)
+
+
+if __name__ == "__main__":
+    main()
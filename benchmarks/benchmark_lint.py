@@ -0,0 +1,383 @@
+# /benchmarks/benchmark_lint.py
+#
+# Benchmarks for the polysquarelint command on generated projects.
+#
+# See /LICENCE.md for Copyright information
+"""Benchmarks for the polysquarelint command on generated projects.
+
+Run python benchmarks/benchmark_lint.py --help for options. Each sample
+runs the command in a fresh interpreter, so imports are counted the
+same way every time. Results are written as JSON, which can be passed
+back with --compare to see how a later version performs.
+"""
+
+import argparse
+
+import json
+
+import multiprocessing
+
+import os
+
+import platform
+
+import shutil
+
+import subprocess
+
+import sys
+
+import tempfile
+
+import time
+
+from _common import (add_output_arguments,
+                     checkout_environment,
+                     median,
+                     write_results)
+
+
+_SCENARIOS = ["cold", "warm", "one-file-changed"]
+
+_MODULE_HEADER = '''# /{path}
+#
+# Generated module {index}.
+"""Generated module {index}."""
+
+import os
+
+import sys
+'''
+
+_FUNCTION = '''
+
+def function_{index}(argument):
+    """Return a value computed from argument."""
+    values = [argument * {index}, len(sys.argv), len(os.sep)]
+    for value in values:
+        if value > {index}:
+            return value
+
+    return sum(values)
+'''
+
+_TEST = '''# /{path}
+#
+# Generated test {index}.
+"""Generated test {index}."""
+
+from unittest import TestCase
+
+from {package}.module_{index} import function_0
+
+
+class TestModule{index}(TestCase):
+    """Tests for module_{index}."""
+
+    def test_function(self):
+        """Call function_0."""
+        self.assertTrue(function_0(1))
+'''
+
+_MARKDOWN = """# Document {index}
+
+This is some documentation for the generated project. It has a few
+paragraphs which are spellchecked like any other markdown file.
+"""
+
+_SETUP = '''# /setup.py
+#
+# Setup script for a generated project.
+"""Setup script for a generated project."""
+
+from setuptools import setup
+
+setup(name="generated-project",
+      version="0.0.1",
+      description="A generated project",
+      long_description="A generated project used for benchmarks.",
+      author="Benchmark",
+      author_email="benchmark@example.com",
+      url="http://example.com",
+      license="MIT",
+      packages=["{package}"])
+'''
+
+
+def _write(path, contents):
+    """Write contents to path, creating directories as needed."""
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    with open(path, "w") as output_file:
+        output_file.write(contents)
+
+
+def _module_contents(path, index, lines):
+    """Get the contents of a module with about lines lines."""
+    contents = _MODULE_HEADER.format(path=path, index=index)
+    function_index = 0
+    while contents.count("\n") < lines or not function_index:
+        contents += _FUNCTION.format(index=function_index)
+        function_index += 1
+
+    return contents
+
+
+def generate_project(directory, modules, lines, markdown, tests):
+    """Generate a project in directory.
+
+    The project has a package with modules modules of about lines lines
+    each, markdown markdown files and tests test files.
+    """
+    package = "generated"
+    _write(os.path.join(directory, "setup.py"), _SETUP.format(package=package))
+    _write(os.path.join(directory, "README.md"), _MARKDOWN.format(index=0))
+    _write(os.path.join(directory, package, "__init__.py"),
+           "# /{0}/__init__.py\n\"\"\"Generated package.\"\"\"\n".format(
+               package))
+    _write(os.path.join(directory, "test", "__init__.py"),
+           "# /test/__init__.py\n\"\"\"Generated tests.\"\"\"\n")
+
+    for index in range(modules):
+        path = "{0}/module_{1}.py".format(package, index)
+        _write(os.path.join(directory, path),
+               _module_contents(path, index, lines))
+
+    for index in range(tests):
+        path = "test/test_module_{0}.py".format(index)
+        _write(os.path.join(directory, path),
+               _TEST.format(path=path,
+                            index=index % max(modules, 1),
+                            package=package))
+
+    for index in range(markdown):
+        _write(os.path.join(directory, "doc", "doc_{0}.md".format(index)),
+               _MARKDOWN.format(index=index + 1))
+
+    return package
+
+
+def _change_one_file(directory, package):
+    """Change the contents of the first module in package.
+
+    Returns its original contents.
+    """
+    path = os.path.join(directory, package, "module_0.py")
+    with open(path) as module:
+        contents = module.read()
+
+    with open(path, "a") as module:
+        module.write(_FUNCTION.format(index=len(contents)))
+
+    return contents
+
+
+def _run_once(project, package, cache_directory, use_multiprocessing):
+    """Run the lint command once in this process.
+
+    Returns its duration and whether it ran linters in a pool of
+    workers. The command lints in-process when there are few files or
+    CPUs, even if multiprocessing is enabled.
+    """
+    from setuptools import Distribution
+
+    from polysquare_setuptools_lint import PolysquareLintCommand, command
+
+    os.chdir(project)
+    if use_multiprocessing:
+        os.environ.pop("DISABLE_MULTIPROCESSING", None)
+    else:
+        os.environ["DISABLE_MULTIPROCESSING"] = "1"
+
+    pools = []
+    create_pool = command._create_pool  # suppress(protected-access)
+
+    def _recorded_create_pool(jobs):
+        """Create a pool of jobs workers, recording that it was used."""
+        pools.append(jobs)
+        return create_pool(jobs)
+
+    command._create_pool = _recorded_create_pool  # suppress(protected-access)
+
+    distribution = Distribution(dict(name="generated-project",
+                                     version="0.0.1",
+                                     packages=[package]))
+    lint_command = PolysquareLintCommand(distribution)
+    lint_command.cache_directory = cache_directory
+    lint_command.ensure_finalized()
+
+    stdout = sys.stdout
+    start = time.time()
+    with open(os.devnull, "w") as devnull:
+        sys.stdout = devnull
+        try:
+            lint_command.run()
+        except SystemExit:
+            pass
+        finally:
+            sys.stdout = stdout
+
+    return time.time() - start, bool(pools)
+
+
+def _sample(project, package, cache_directory, use_multiprocessing):
+    """Time one run of the lint command on project in a fresh interpreter.
+
+    Returns its duration and whether it used a pool of workers.
+    """
+    output = subprocess.check_output([sys.executable,
+                                      os.path.abspath(__file__),
+                                      "--run-once",
+                                      project,
+                                      package,
+                                      cache_directory,
+                                      str(int(use_multiprocessing))],
+                                     env=checkout_environment())
+    sample = json.loads(output.decode("utf-8").strip().splitlines()[-1])
+    return sample["seconds"], sample["multiprocessing"]
+
+
+def run_scenario(scenario, project, package, use_multiprocessing, repeat):
+    """Time scenario repeat times.
+
+    Returns a list of durations and whether every sample used a pool
+    of workers. cold starts with an empty cache, warm lints again with
+    the cache from a previous run and one-file-changed changes one
+    module after filling the cache.
+    """
+    durations = []
+    used_pool = True
+    for _ in range(repeat):
+        cache_directory = tempfile.mkdtemp(prefix="lint-benchmark-cache")
+        original = None
+        try:
+            if scenario != "cold":
+                _sample(project, package, cache_directory, use_multiprocessing)
+
+            if scenario == "one-file-changed":
+                original = _change_one_file(project, package)
+
+            duration, sample_used_pool = _sample(project,
+                                                 package,
+                                                 cache_directory,
+                                                 use_multiprocessing)
+            durations.append(duration)
+            used_pool = used_pool and sample_used_pool
+        finally:
+            shutil.rmtree(cache_directory)
+            if original is not None:
+                _write(os.path.join(project, package, "module_0.py"),
+                       original)
+
+    return durations, used_pool
+
+
+def _compare(results, previous):
+    """Print how results compare to the previous results.
+
+    Results are compared by scenario and requested multiprocessing mode.
+    """
+    medians = dict([((r["scenario"], r["multiprocessing"]), r["median"])
+                    for r in previous["results"]])
+    for result in results["results"]:
+        key = (result["scenario"], result["multiprocessing"])
+        if key in medians:
+            sys.stderr.write("{0:<20} {1:<18} {2:>8.3f} {3:>8.3f} "
+                             "{4:>7.2f}x\n".format(
+                                 result["scenario"],
+                                 "multiprocessing" if key[1] else "serial",
+                                 medians[key],
+                                 result["median"],
+                                 result["median"] / (medians[key] or 1.0)))
+
+
+def _parse_arguments(arguments):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", type=int, default=20,
+                        help="""Number of modules to generate""")
+    parser.add_argument("--lines", type=int, default=200,
+                        help="""Approximate lines in each module""")
+    parser.add_argument("--markdown", type=int, default=5,
+                        help="""Number of markdown files to generate""")
+    parser.add_argument("--tests", type=int, default=10,
+                        help="""Number of test files to generate""")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="""Number of samples for each scenario""")
+    parser.add_argument("--scenarios", default=",".join(_SCENARIOS),
+                        help="""Comma separated scenarios to run, """
+                             """from {0}""".format(", ".join(_SCENARIOS)))
+    parser.add_argument("--multiprocessing", default="on,off",
+                        help="""Comma separated multiprocessing modes, """
+                             """from on and off""")
+    add_output_arguments(parser)
+    parser.add_argument("--run-once", nargs=4, default=None,
+                        help=argparse.SUPPRESS)
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    """Generate a project, run the benchmarks and write the results."""
+    arguments = _parse_arguments(arguments)
+
+    if arguments.run_once:
+        project, package, cache_directory, use_multiprocessing = (
+            arguments.run_once
+        )
+        duration, used_pool = _run_once(project,
+                                        package,
+                                        cache_directory,
+                                        int(use_multiprocessing))
+        sys.stdout.write(json.dumps({
+            "seconds": duration,
+            "multiprocessing": used_pool
+        }) + "\n")
+        return
+
+    project = tempfile.mkdtemp(prefix="lint-benchmark-project")
+    results = {
+        "python": "{0} {1}".format(platform.python_implementation(),
+                                   platform.python_version()),
+        "cpus": multiprocessing.cpu_count(),
+        "project": {
+            "modules": arguments.modules,
+            "lines": arguments.lines,
+            "markdown": arguments.markdown,
+            "tests": arguments.tests
+        },
+        "results": []
+    }
+
+    try:
+        package = generate_project(project,
+                                   arguments.modules,
+                                   arguments.lines,
+                                   arguments.markdown,
+                                   arguments.tests)
+        for mode in arguments.multiprocessing.split(","):
+            for scenario in arguments.scenarios.split(","):
+                # Whether a pool was actually used is recorded as well
+                # as the requested mode, since the command lints
+                # in-process with few files or CPUs.
+                durations, used_pool = run_scenario(scenario,
+                                                    project,
+                                                    package,
+                                                    mode == "on",
+                                                    arguments.repeat)
+                results["results"].append({
+                    "scenario": scenario,
+                    "multiprocessing": mode == "on",
+                    "used_pool": used_pool,
+                    "seconds": durations,
+                    "median": median(durations)
+                })
+    finally:
+        shutil.rmtree(project)
+
+    write_results(results, arguments, _compare)
+
+
+if __name__ == "__main__":
+    main()
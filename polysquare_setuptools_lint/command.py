@@ -0,0 +1,3210 @@
+# /polysquare_setuptools_lint/command.py
+#
+# The implementation of the polysquarelint command, which runs pyroma,
+# prospector and flake8 with maximum settings on all distributed files
+# and tests. This is only imported once the command is used.
+#
+# See /LICENCE.md for Copyright information
+"""The implementation of the polysquarelint command."""
+
+import ast
+
+import errno
+
+import json
+
+import hashlib
+
+import io
+
+import multiprocessing
+
+import os
+import os.path
+
+import re
+
+import subprocess
+
+import time
+
+import traceback
+
+import sys  # suppress(I100)
+import tempfile  # suppress(I100)
+from sys import exit as sys_exit  # suppress(I100)
+
+from collections import OrderedDict, namedtuple  # suppress(I100)
+
+from contextlib import contextmanager
+
+from distutils.errors import (DistutilsArgError,  # suppress(import-error)
+                              DistutilsExecError,
+                              DistutilsPlatformError)
+
+from fnmatch import translate as fntranslate
+
+import tokenize  # suppress(I100)
+
+from polysquare_setuptools_lint import (can_run_frosted,
+                                        can_run_pylint)
+
+try:
+    import cPickle as pickle  # suppress(import-error)
+except ImportError:
+    import pickle
+
+try:
+    from Queue import Empty, Queue  # suppress(import-error)
+except ImportError:
+    from queue import Empty, Queue  # suppress(import-error)
+
+try:
+    from os import scandir as _scandir  # suppress(no-name-in-module)
+except ImportError:
+    try:
+        from scandir import scandir as _scandir  # suppress(import-error)
+    except ImportError:
+        _scandir = None
+
+
+@contextmanager
+def _custom_argv(argv):
+    """Overwrite argv[1:] with argv, restore on exit."""
+    backup_argv = sys.argv
+    sys.argv = backup_argv[:1] + argv
+    try:
+        yield
+    finally:
+        sys.argv = backup_argv
+
+
+def _discard_log(*args, **kwargs):
+    """Discard a log message."""
+    del args
+    del kwargs
+
+
+@contextmanager
+def _patched_pep257():
+    """Monkey-patch pep257 after imports to avoid info logging."""
+    import pep257
+
+    if getattr(pep257, "log", None):
+        old_log_info = pep257.log.info
+        pep257.log.info = _discard_log  # suppress(unused-attribute)
+    try:
+        yield
+    finally:
+        if getattr(pep257, "log", None):
+            pep257.log.info = old_log_info
+
+
+@contextmanager
+def _patched_prospector_tools(replacements):
+    """Monkey-patch prospector to create replacements for its tools."""
+    from prospector import tools
+
+    old_tools = dict(tools.TOOLS)
+    tools.TOOLS.update(replacements)
+    try:
+        yield
+    finally:
+        tools.TOOLS.clear()
+        tools.TOOLS.update(old_tools)
+
+
+# Distributions whose versions affect the results of the linters. A
+# change in any of these invalidates all cached results.
+_LINTER_DISTRIBUTIONS = [
+    "astroid",
+    "dodgy",
+    "flake8",
+    "flake8-blind-except",
+    "flake8-docstrings",
+    "flake8-double-quotes",
+    "flake8-import-order",
+    "flake8-todo",
+    "frosted",
+    "pep257",
+    "pep8",
+    "pep8-naming",
+    "polysquare-generic-file-linter",
+    "polysquare-setuptools-lint",
+    "prospector",
+    "pyflakes",
+    "pylint",
+    "pylint-common",
+    "pyroma",
+    "vulture"
+]
+
+# Bump this whenever the format of cached results changes.
+_CACHE_FORMAT_VERSION = 3
+
+
+def _linter_versions():
+    """Get a string identifying the installed versions of all linters."""
+    import pkg_resources
+
+    versions = []
+    for name in _LINTER_DISTRIBUTIONS:
+        try:
+            version = pkg_resources.get_distribution(name).version
+        except pkg_resources.DistributionNotFound:
+            version = "none"
+
+        versions.append("{0}=={1}".format(name, version))
+
+    return ",".join(versions)
+
+
+def _file_digest(filename):
+    """Get a hex digest of the contents of filename."""
+    from polysquare_setuptools_lint import parsed_files
+
+    source = parsed_files.get(filename).source
+    if source is None:
+        return "missing"
+
+    return hashlib.sha1(source).hexdigest()
+
+
+def _ensure_directory(directory):
+    """Create directory if it does not already exist."""
+    try:
+        os.makedirs(directory)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            raise error
+
+
+def _remove_if_exists(path):
+    """Remove the file at path if there is one."""
+    try:
+        os.remove(path)
+    except OSError as error:
+        if error.errno != errno.ENOENT:
+            raise error
+
+
+def _replace_file(path, contents):
+    """Atomically replace the file at path with the bytes in contents.
+
+    Where os.replace is missing, on Python 2, os.rename can't replace
+    an existing file on Windows, so the file is removed first and the
+    replacement is not atomic there. A file which can't be replaced is
+    left as it was and the failure is written to stderr.
+    """
+    _ensure_directory(os.path.dirname(path))
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(handle, "wb") as replacement_file:
+        replacement_file.write(contents)
+
+    try:
+        if not hasattr(os, "replace") and os.name == "nt":
+            _remove_if_exists(path)
+
+        getattr(os, "replace", os.rename)(temporary, path)
+    except OSError as error:
+        os.remove(temporary)
+        sys.stderr.write("""Could not replace {0}: {1}\n""".format(path,
+                                                                   error))
+
+
+def _relocated(result, relocate):
+    """Get result with relocate applied to the path of each message in it.
+
+    Results which are not lists of messages are returned as they are.
+    """
+    if not isinstance(result, list):
+        return result
+
+    return [r._replace(path=_interned(relocate(r.path)))
+            if isinstance(r, _Message) else r for r in result]
+
+
+class _ResultCache(namedtuple("_ResultCache", "directory salt")):
+    """A cache of linter results, keyed on the content of their inputs.
+
+    Unlike timestamps, content hashes survive fresh checkouts and
+    switching between branches, so unchanged files are never re-linted.
+    The salt identifies the linter versions and the interpreter, so that
+    upgrading either invalidates everything. A directory of None
+    disables the cache.
+
+    Dependencies are keyed on their paths relative to the current
+    directory, and messages are stored with relative paths, so that
+    checkouts in different directories share results.
+    """
+
+    def key(self, namespace, dependencies, *options):
+        """Get a key for namespace, dependencies and options."""
+        digest = hashlib.sha1()
+        digest.update(repr((self.salt, namespace, options)).encode("utf-8"))
+        for dependency in dependencies:
+            digest.update(repr((os.path.relpath(dependency),
+                                _file_digest(dependency))).encode("utf-8"))
+
+        return digest.hexdigest()
+
+    def _path(self, key):
+        """Get the path to the cache entry for key."""
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Get the result stored at key or None if there isn't one."""
+        if self.directory is None:
+            return None
+
+        try:
+            with open(self._path(key), "rb") as cache_file:
+                return _relocated(pickle.load(cache_file), os.path.abspath)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def put(self, key, result):
+        """Store result at key, atomically replacing any previous one."""
+        if self.directory is None:
+            return
+
+        _replace_file(self._path(key),
+                      pickle.dumps(_relocated(result, os.path.relpath),
+                                   pickle.HIGHEST_PROTOCOL))
+
+
+def _result_cache(directory):
+    """Get a _ResultCache storing results in directory.
+
+    The cache is disabled if JOBSTAMPS_DISABLED is set in the environment.
+    """
+    if os.environ.get("JOBSTAMPS_DISABLED", None):
+        directory = None
+
+    salt = "{0};{1};{2}".format(_CACHE_FORMAT_VERSION,
+                                sys.version,
+                                _linter_versions())
+    return _ResultCache(directory, salt)
+
+
+# Files linted because their results were not cached, since this list was
+# last cleared. Used to attribute job durations to the files that took
+# time to lint.
+_CACHE_MISSES = list()
+
+
+def _cached_deps(cache, func, dependencies, *args, **kwargs):
+    """Run func, assumed to have dependencies as its first argument.
+
+    The result is looked up in cache first, keyed on the content of
+    dependencies and all other arguments to func.
+
+    If a cache_salt is passed, it is added to the key, for results
+    which depend on more than dependencies and the arguments.
+    """
+    cache_salt = kwargs.pop("cache_salt", None)
+    if not isinstance(dependencies, list):
+        cache_dependencies = [dependencies]
+    else:
+        cache_dependencies = dependencies
+
+    key_options = (args, sorted(kwargs.items()))
+    if cache_salt:
+        key_options += (cache_salt, )
+
+    key = cache.key(func.__name__, cache_dependencies, *key_options)
+    result = cache.get(key)
+    if result is None:
+        _CACHE_MISSES.extend(cache_dependencies)
+        result = func(dependencies, *args, **kwargs)
+        cache.put(key, result)
+
+    return result
+
+
+# Strings which repeat across many messages in this process.
+_INTERNED = dict()
+
+
+def _interned(value):
+    """Get the one copy of value shared by every message in this process.
+
+    Pickle stores an object it has already seen as a reference, so
+    messages sharing their strings are sent between processes and
+    stored in the cache with each path and code written out once.
+    """
+    return _INTERNED.setdefault(value, value)
+
+
+class _Message(namedtuple("_Message",
+                          "path line code source character function text")):
+    """A linter message, as passed between processes and cached.
+
+    The first three fields identify a message, so that messages
+    reported by more than one linter are only reported once, and
+    messages sort by them. The line is None for messages about a whole
+    file, as in prospector. Messages are converted to prospector
+    messages only when they are rendered.
+    """
+
+    __slots__ = ()
+
+
+def _message(source, code, path, line, text, character=0, function=None):
+    """Create a _Message, sharing strings with other messages."""
+    return _Message(_interned(path),
+                    line,
+                    _interned(code),
+                    _interned(source),
+                    character,
+                    _interned(function),
+                    text)
+
+
+def _split_by_file(messages, filenames):
+    """Split messages into a list of messages for each of filenames.
+
+    Messages for files not in filenames are dropped.
+    """
+    split = dict([(filename, list()) for filename in filenames])
+    for message in messages:
+        if message.path in split:
+            split[message.path].append(message)
+
+    return split
+
+
+def _cached_batch(cache, func, filenames, *args, **kwargs):
+    """Run func once over all of filenames not already in cache.
+
+    func is assumed to take a list of files as its first argument. Its
+    result is split by file and each file's messages are cached
+    separately, using the same key as _cached_deps with a single file.
+
+    If a cache_salts dict is passed, the salt for each file is added to
+    its key, for results which depend on more than the file itself.
+
+    Messages about files other than filenames are dropped, whether or
+    not the results were cached.
+    """
+    cache_salts = kwargs.pop("cache_salts", dict())
+    messages = list()
+    uncached = list()
+    for filename in filenames:
+        key_options = (args, sorted(kwargs.items()))
+        if cache_salts.get(filename):
+            key_options += (cache_salts[filename], )
+
+        key = cache.key(func.__name__, [filename], *key_options)
+        result = cache.get(key)
+        if result is None:
+            uncached.append((filename, key))
+        else:
+            messages.extend(result)
+
+    if uncached:
+        _CACHE_MISSES.extend([f for f, _ in uncached])
+        result = func([f for f, _ in uncached], *args, **kwargs)
+        split = _split_by_file(result, [f for f, _ in uncached])
+        for filename, key in uncached:
+            cache.put(key, split[filename])
+            messages.extend(split[filename])
+
+    return messages
+
+
+# Configuration files in the project which each linter reads.
+_FLAKE8_CONFIG_FILES = [
+    ".flake8",
+    ".pep8",
+    "setup.cfg",
+    "tox.ini"
+]
+
+_PROSPECTOR_CONFIG_FILES = [
+    ".landscape.yaml",
+    ".landscape.yml",
+    ".pep257",
+    ".pep8",
+    ".prospector.yaml",
+    ".prospector.yml",
+    ".pylintrc",
+    "landscape.yaml",
+    "landscape.yml",
+    "prospector.yaml",
+    "prospector.yml",
+    "pylintrc",
+    "setup.cfg",
+    "tox.ini"
+]
+
+
+def _config_digest(config_files):
+    """Get a digest of the contents of each of config_files."""
+    digests = [(f, _file_digest(f)) for f in config_files]
+    return hashlib.sha1(repr(digests).encode("utf-8")).hexdigest()
+
+
+def _module_name(filename):
+    """Get the dotted module name of filename, relative to the cwd."""
+    parts = os.path.splitext(os.path.relpath(filename))[0].split(os.sep)
+    if len(parts) > 1 and parts[-1] == "__init__":
+        parts = parts[:-1]
+
+    return ".".join(parts)
+
+
+def _imported_modules(filename):
+    """Get the names of all modules that filename might import.
+
+    For "from a import b", both "a" and "a.b" are included, since b
+    might be a submodule. Relative imports are resolved against the
+    package of filename.
+    """
+    from polysquare_setuptools_lint import parsed_files
+
+    tree = parsed_files.get(filename).tree
+    if tree is None:
+        return list()
+
+    package = _module_name(filename).split(".")
+    if os.path.basename(filename) != "__init__.py":
+        package = package[:-1]
+
+    imported = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imported.update([alias.name for alias in node.names])
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = package[:max(0, len(package) - node.level + 1)]
+            else:
+                base = list()
+
+            base = ".".join(base + (node.module or "").split("."))
+            base = base.strip(".")
+            imported.update([".".join([base, alias.name]).strip(".")
+                             for alias in node.names] + [base])
+
+    return sorted([name for name in imported if name])
+
+
+def _import_graph(files, digests, graph_path):
+    """Get a dict of each of files to the files it imports.
+
+    The modules imported by each file are persisted at graph_path along
+    with the digest of the file, so only changed files are parsed again.
+    Persisted entries for other files are kept, so that runs over some
+    of the files, like those with --changed-since, don't throw them
+    away, unless the file no longer exists.
+    """
+    try:
+        with open(graph_path) as graph_file:
+            persisted = json.load(graph_file)
+    except (IOError, OSError, ValueError):
+        persisted = dict()
+
+    modules = dict([(_module_name(f), f) for f in files])
+    imports = dict()
+    for filename in files:
+        entry = persisted.get(filename, None)
+        if entry and entry["digest"] == digests[filename]:
+            imports[filename] = entry["imports"]
+        else:
+            imports[filename] = _imported_modules(filename)
+
+    entries = dict([(f, e) for f, e in persisted.items()
+                    if os.path.exists(f)])
+    entries.update([(f, {"digest": digests[f], "imports": imports[f]})
+                    for f in files])
+    _replace_file(graph_path, json.dumps(entries).encode("utf-8"))
+
+    graph = dict()
+    for filename in files:
+        # Importing a.b.c imports a and a.b too.
+        dependencies = set()
+        for name in imports[filename]:
+            parts = name.split(".")
+            dependencies.update([modules[".".join(parts[:i])]
+                                 for i in range(1, len(parts) + 1)
+                                 if ".".join(parts[:i]) in modules])
+
+        dependencies.discard(filename)
+        graph[filename] = sorted(dependencies)
+
+    return graph
+
+
+def _import_digests(files, graph_path):
+    """Get a digest of everything each of files transitively imports.
+
+    Messages from pylint depend on the modules a file imports, so the
+    digest is used to invalidate cached results for a file whenever a
+    module it depends on changes.
+    """
+    digests = dict([(f, _file_digest(f)) for f in files])
+    graph = _import_graph(files, digests, graph_path)
+    import_digests = dict()
+
+    for filename in files:
+        reachable = set()
+        pending = list(graph[filename])
+        while pending:
+            dependency = pending.pop()
+            if dependency not in reachable:
+                reachable.add(dependency)
+                pending.extend(graph[dependency])
+
+        reachable.discard(filename)
+        digest = hashlib.sha1()
+        for dependency in sorted(reachable):
+            digest.update(repr((os.path.relpath(dependency),
+                                digests[dependency])).encode("utf-8"))
+
+        import_digests[filename] = digest.hexdigest()
+
+    return import_digests
+
+
+def _debug_linter_status(linter, filename, show_lint_files):
+    """Indicate that we are running this linter if required."""
+    if show_lint_files:
+        print("{linter}: {filename}".format(linter=linter, filename=filename))
+
+
+# flake8 style guides for this process, by working directory and
+# configuration. Creating one loads every flake8 plugin and parses
+# options, so it happens once.
+_FLAKE8_STYLE_GUIDES = dict()
+
+
+def _flake8_style_guide():
+    """Get the flake8 style guide for the current directory.
+
+    Its report collects messages into its collected list, instead of
+    printing them. A new one is created when flake8's configuration
+    files change.
+    """
+    cwd = os.getcwd()
+    guide_key = (cwd, _config_digest(_FLAKE8_CONFIG_FILES))
+    try:
+        return _FLAKE8_STYLE_GUIDES[guide_key]
+    except KeyError:
+        from flake8.engine import get_style_guide
+        from pep8 import BaseReport
+
+    class Flake8MergeReporter(BaseReport):
+        """An implementation of pep8.BaseReport merging results.
+
+        This implementation merges results from the flake8 report
+        into the prospector report created earlier.
+        """
+
+        def __init__(self, options):
+            """Initialize this Flake8MergeReporter."""
+            super(Flake8MergeReporter, self).__init__(options)
+            self._current_file = ""
+            self.collected = list()
+
+        def init_file(self, filename, lines, expected, line_offset):
+            """Start processing filename."""
+            relative_path = os.path.join(cwd, filename)
+            self._current_file = os.path.realpath(relative_path)
+
+            super(Flake8MergeReporter, self).init_file(filename,
+                                                       lines,
+                                                       expected,
+                                                       line_offset)
+
+        def error(self, line_number, offset, text, check):
+            """Record error and store in collected."""
+            code = super(Flake8MergeReporter, self).error(line_number,
+                                                          offset,
+                                                          text,
+                                                          check) or "no-code"
+
+            self.collected.append(_message(code,
+                                           code,
+                                           self._current_file,
+                                           line_number,
+                                           text[5:],
+                                           character=offset))
+
+    style_guide = get_style_guide(reporter=Flake8MergeReporter, jobs="1")
+    _FLAKE8_STYLE_GUIDES[guide_key] = style_guide
+    return style_guide
+
+
+_FLAKE8_CHECK_KINDS = ("physical_checks", "logical_checks", "ast_checks")
+
+
+@contextmanager
+def _skipped_flake8_checks(style_guide, skip_checks):
+    """Leave the checks named in skip_checks out of style_guide's runs."""
+    options = style_guide.options
+    all_checks = [getattr(options, kind) for kind in _FLAKE8_CHECK_KINDS]
+    for kind, checks in zip(_FLAKE8_CHECK_KINDS, all_checks):
+        setattr(options, kind, [c for c in checks if c[0] not in skip_checks])
+    try:
+        yield
+    finally:
+        for kind, checks in zip(_FLAKE8_CHECK_KINDS, all_checks):
+            setattr(options, kind, checks)
+
+
+# pep8's checks which pycodestyle, as run by prospector, changed.
+_PEP8_CHANGED_CHECKS = frozenset([
+    "break_around_binary_operator",
+    "whitespace_around_named_parameter_equals"
+])
+
+# Modules of flake8's checks which prospector's tools also run, by the
+# name of the prospector tool. pep8-naming runs in both linters, since
+# its errors don't say which of its checks found them.
+_FLAKE8_CHECKS_IN_PROSPECTOR = {
+    "pep8": ("pep8", ),
+    "pyflakes": ("flake8._pyflakes", )
+}
+
+
+def _shared_flake8_checks(disabled_linters):
+    """Get the names of flake8's checks which prospector runs instead.
+
+    When both linters are enabled, prospector's pep8 and pyflakes tools
+    run these checks once and report their errors for flake8 too.
+    """
+    if "flake8" in disabled_linters:
+        return list()
+
+    modules = set()
+    for tool, tool_modules in _FLAKE8_CHECKS_IN_PROSPECTOR.items():
+        if tool not in disabled_linters:
+            modules.update(tool_modules)
+
+    options = _flake8_style_guide().options
+    return sorted([name
+                   for kind in _FLAKE8_CHECK_KINDS
+                   for name, check, _ in getattr(options, kind)
+                   if check.__module__ in modules and
+                   name not in _PEP8_CHANGED_CHECKS])
+
+
+def _run_flake8_internal(filenames, skip_checks=()):
+    """Run flake8 on filenames, without the checks in skip_checks.
+
+    This does what check_files would, but passes in lines which were
+    already read, where there are any.
+    """
+    from polysquare_setuptools_lint import parsed_files
+
+    style_guide = _flake8_style_guide()
+    report = style_guide.options.report
+    report.collected = list()
+    report.start()
+    with _skipped_flake8_checks(style_guide, skip_checks):
+        for filename in filenames:
+            if not style_guide.excluded(filename):
+                lines = parsed_files.get(filename).lines
+
+                # pep8 strips byte order marks from the lines it is given.
+                style_guide.input_file(filename,
+                                       lines=list(lines) if lines else None)
+
+    report.stop()
+
+    return report.collected
+
+
+def _run_flake8(filenames, cache, disabled_linters, show_lint_files):
+    """Run flake8 once over filenames, cached per file in cache.
+
+    Checks which prospector runs for flake8 are left out. Results are
+    cached along with flake8's configuration files.
+    """
+    for filename in filenames:
+        _debug_linter_status("flake8", filename, show_lint_files)
+
+    config_digest = _config_digest(_FLAKE8_CONFIG_FILES)
+    return _cached_batch(cache,
+                         _run_flake8_internal,
+                         filenames,
+                         _shared_flake8_checks(disabled_linters),
+                         cache_salts=dict([(f, config_digest)
+                                           for f in filenames]))
+
+
+class _SharedFlake8Checks(object):
+    """flake8's errors from the checks prospector's tools run for it.
+
+    Errors are recorded as flake8's report records them, after flake8's
+    ignore list. Checks which prospector's tools did not run on a file,
+    or ran with other options than flake8's, are run by flake8 itself.
+    """
+
+    def __init__(self, check_names):
+        """Initialize this _SharedFlake8Checks for check_names."""
+        super(_SharedFlake8Checks, self).__init__()
+        self.style_guide = _flake8_style_guide()
+        self.check_names = frozenset(check_names)
+        self._errors = list()
+        self._checks_run = dict()
+
+    def checks_like(self, options):
+        """Get the names of the shared checks options runs as flake8 does.
+
+        A check runs the same way if it takes the same options from both.
+        """
+        flake8_options = self.style_guide.options
+        names = set([name
+                     for kind in _FLAKE8_CHECK_KINDS
+                     for name, _, _ in getattr(options, kind)])
+        return frozenset([name
+                          for kind in _FLAKE8_CHECK_KINDS
+                          for name, _, args in getattr(flake8_options, kind)
+                          if name in self.check_names and name in names and
+                          all([getattr(options, arg, None) ==
+                               getattr(flake8_options, arg)
+                               for arg in args
+                               if hasattr(flake8_options, arg)])])
+
+    def ran(self, filename, check_names):
+        """Record that the checks in check_names ran on filename."""
+        self._checks_run.setdefault(os.path.realpath(filename),
+                                    set()).update(check_names)
+
+    def error(self, filename, line_number, offset, text):
+        """Record an error, as flake8's report would."""
+        code = text[:4]
+        if self.style_guide.options.ignore_code(code):
+            code = "no-code"
+
+        self._errors.append(_message(code,
+                                     code,
+                                     os.path.realpath(filename),
+                                     line_number,
+                                     text[5:],
+                                     character=offset))
+
+    def messages(self, filenames):
+        """Get flake8's messages about filenames from the shared checks."""
+        from flake8.engine import _flake8_noqa
+        from polysquare_setuptools_lint import parsed_files
+
+        # flake8 skips excluded files and files marked with flake8: noqa.
+        skipped = set()
+        not_run = dict()
+        for filename in filenames:
+            path = os.path.realpath(filename)
+            lines = parsed_files.get(filename).lines or list()
+            if (self.style_guide.excluded(filename) or
+                    any([_flake8_noqa(line) for line in lines])):
+                skipped.add(path)
+                continue
+
+            missing = self.check_names - self._checks_run.get(path, set())
+            if missing:
+                not_run.setdefault(frozenset(missing), list()).append(filename)
+
+        messages = [m for m in self._errors if m.path not in skipped]
+        all_checks = set([name
+                          for kind in _FLAKE8_CHECK_KINDS
+                          for name, _, _ in getattr(self.style_guide.options,
+                                                    kind)])
+        for missing, group in not_run.items():
+            messages.extend(_run_flake8_internal(group, all_checks - missing))
+
+        return messages
+
+
+def _parsed_file_tools(shared):
+    """Get prospector tools which check files from parsed_files.
+
+    pep8 is given the lines of each file and pyflakes its syntax tree.
+    Both read the file themselves if it could not be decoded or parsed.
+    If shared is not None, errors from the checks flake8 also runs are
+    recorded in it.
+    """
+    from pep8 import noqa
+    from polysquare_setuptools_lint import parsed_files
+    from prospector.tools.pep8 import Pep8Tool, ProspectorReport
+    from prospector.tools.pyflakes import ProspectorReporter, PyFlakesTool
+    from pyflakes.api import checkPath
+    from pyflakes.checker import Checker
+
+    class ParsedPep8Tool(Pep8Tool):
+        """prospector's pep8 tool, checking lines from parsed_files."""
+
+        def configure(self, prospector_config, found_files):
+            """Configure pep8 to check the lines of each file."""
+            result = super(ParsedPep8Tool, self).configure(prospector_config,
+                                                           found_files)
+            checker = self.checker
+            if shared:
+                shared_checks = shared.checks_like(checker.options)
+            else:
+                shared_checks = frozenset()
+
+            class SharedReport(ProspectorReport):
+                """Report which also records errors from shared checks."""
+
+                def error(self, line_number, offset, text, check):
+                    """Record the error for flake8 if its check is shared."""
+                    if getattr(check, "__name__", None) in shared_checks:
+                        shared.error(self.filename, line_number, offset, text)
+
+                    return super(SharedReport, self).error(line_number,
+                                                           offset,
+                                                           text,
+                                                           check)
+
+            def input_file(filename):
+                """Check filename, passing in lines already read."""
+                lines = parsed_files.get(filename).lines
+                if shared:
+                    shared.ran(filename, shared_checks)
+
+                # pep8 strips byte order marks from the lines it is given.
+                return checker.input_file(filename,
+                                          lines=list(lines) if lines else None)
+
+            checker.init_report(SharedReport)
+            checker.runner = input_file
+            return result
+
+    class ParsedPyFlakesTool(PyFlakesTool):
+        """prospector's pyflakes tool, checking trees from parsed_files."""
+
+        def run(self, found_files):
+            """Check each file, as pyflakes.api.checkPath would."""
+            if shared:
+                options = shared.style_guide.options
+                flakes = [(name, check)
+                          for name, check, _ in options.ast_checks
+                          if name in shared.check_names]
+            else:
+                flakes = list()
+
+            reporter = ProspectorReporter(ignore=self.ignore_codes)
+            for filename in found_files.iter_module_paths():
+                parsed = parsed_files.get(filename)
+                if parsed.tree is None:
+                    # flake8 runs no pyflakes checks on files which
+                    # can't be parsed either.
+                    if shared:
+                        shared.ran(filename, [name for name, _ in flakes])
+
+                    checkPath(filename, reporter)
+                    continue
+
+                checker = Checker(parsed.tree, filename)
+
+                # flake8 uses the same checker, with its own options.
+                shared_checks = [name for name, check in flakes
+                                 if check.builtIns == checker.builtIns and
+                                 check.withDoctest == checker.withDoctest and
+                                 parsed.lines is not None]
+                if shared_checks:
+                    shared.ran(filename, shared_checks)
+
+                for message in sorted(checker.messages,
+                                      key=lambda m: m.lineno):
+                    reporter.flake(message)
+                    if (shared_checks and
+                            not noqa(parsed.lines[message.lineno - 1])):
+                        shared.error(filename,
+                                     message.lineno,
+                                     getattr(message, "col", 0),
+                                     message.flake8_msg %
+                                     message.message_args)
+
+            return reporter.get_messages()
+
+    return dict(pep8=ParsedPep8Tool, pyflakes=ParsedPyFlakesTool)
+
+
+# suppress(too-many-locals)
+def _run_prospector_on(filenames,
+                       tools,
+                       disabled_linters,
+                       ignore_codes=None,
+                       flake8_checks=None):
+    """Run prospector on filename, using the specified tools.
+
+    This function enables us to run different tools on different
+    classes of files, which is necessary in the case of tests.
+
+    flake8's messages from the checks in flake8_checks, which pep8 and
+    pyflakes run once for both linters, are returned along with
+    prospector's own, unless prospector reported the same message.
+    """
+    from prospector.run import Prospector, ProspectorConfig
+
+    assert tools
+
+    tools = list(set(tools) - set(disabled_linters))
+    ignore_codes = ignore_codes or list()
+
+    # Early return if all tools were filtered out. Prospector lints the
+    # whole of the current directory when it is given no files.
+    if not tools or not filenames:
+        return list()
+
+    # pylint doesn't like absolute paths, so convert to relative.
+    all_argv = (["-F", "-D", "-M", "--no-autodetect", "-s", "veryhigh"] +
+                ("-t " + " -t ".join(tools)).split(" "))
+
+    if flake8_checks:
+        shared = _SharedFlake8Checks(flake8_checks)
+    else:
+        shared = None
+
+    with _custom_argv(all_argv + [os.path.relpath(f) for f in filenames]):
+        prospector = Prospector(ProspectorConfig())
+        with _patched_prospector_tools(_parsed_file_tools(shared)):
+            prospector.execute()
+
+        messages = list()
+        for message in prospector.get_messages() or list():
+            message.to_absolute_path(os.getcwd())
+            loc = message.location
+
+            if message.code in ignore_codes:
+                continue
+
+            messages.append(_message(message.source,
+                                     message.code,
+                                     loc.path,
+                                     loc.line,
+                                     message.message,
+                                     character=loc.character,
+                                     function=loc.function))
+
+    if shared:
+        reported = set([m[:3] for m in messages])
+        messages.extend([m for m in shared.messages(filenames)
+                         if m[:3] not in reported])
+
+    return messages
+
+
+def _file_is_test(filename):
+    """Return true if file is a test."""
+    is_test = re.compile(r"^.*test[^{0}]*.py$".format(re.escape(os.path.sep)))
+    return bool(is_test.match(filename))
+
+
+def _prospector_options(filename):
+    """Get the prospector tools and ignore codes to use on filename."""
+    linter_tools = [
+        "pep257",
+        "pep8",
+        "pyflakes"
+    ]
+
+    if can_run_pylint():
+        linter_tools.append("pylint")
+
+    # Run prospector on tests. There are some errors we don't care about:
+    # - invalid-name: This is often triggered because test method names
+    #                 can be quite long. Descriptive test method names are
+    #                 good, so disable this warning.
+    # - super-on-old-class: unittest.TestCase is a new style class, but
+    #                       pylint detects an old style class.
+    # - too-many-public-methods: TestCase subclasses by definition have
+    #                            lots of methods.
+    test_ignore_codes = [
+        "invalid-name",
+        "super-on-old-class",
+        "too-many-public-methods"
+    ]
+
+    if _file_is_test(filename):
+        return linter_tools, test_ignore_codes
+
+    if can_run_frosted():
+        linter_tools += ["frosted"]
+
+    return linter_tools, list()
+
+
+def _run_prospector(filenames,
+                    cache,
+                    disabled_linters,
+                    import_digests,
+                    show_lint_files):
+    """Run prospector over a batch of filenames.
+
+    Files sharing the same tools and ignore codes are run through a single
+    Prospector session, instead of setting up pylint and friends again
+    for each file. Cached results for a file are invalidated by changes
+    to the modules it imports, as given by import_digests, and to the
+    configuration files of prospector and its tools.
+
+    Unless flake8 is disabled, its messages from the checks which
+    prospector runs for it are returned too.
+    """
+    config_digest = _config_digest(_PROSPECTOR_CONFIG_FILES)
+    flake8_checks = _shared_flake8_checks(disabled_linters)
+    if flake8_checks:
+        config_digest += _config_digest(_FLAKE8_CONFIG_FILES)
+
+    groups = dict()
+    for filename in filenames:
+        _debug_linter_status("prospector", filename, show_lint_files)
+        tools, ignore_codes = _prospector_options(filename)
+        groups.setdefault((tuple(tools), tuple(ignore_codes)),
+                          list()).append(filename)
+
+    messages = list()
+    for (tools, ignore_codes), group in sorted(groups.items()):
+        # Only disabled tools affect the results, so leave other linters
+        # out of the cache key.
+        disabled_tools = sorted(set(tools) & set(disabled_linters))
+        messages.extend(_cached_batch(cache,
+                                      _run_prospector_on,
+                                      group,
+                                      list(tools),
+                                      disabled_tools,
+                                      ignore_codes=list(ignore_codes),
+                                      flake8_checks=flake8_checks,
+                                      cache_salts=dict([
+                                          (f, (import_digests.get(f),
+                                               config_digest))
+                                          for f in group
+                                      ])))
+
+    return messages
+
+
+# Run in a subprocess, so that /setup.py is executed there. Anything
+# written to stdout by /setup.py goes to stderr instead, leaving
+# stdout for the names and messages of the failed ratings.
+_PYROMA_SCRIPT = """
+import json
+import os
+import sys
+from pyroma import projectdata, ratings
+output = sys.stdout
+sys.stdout = sys.stderr
+data = projectdata.get_data(os.getcwd())
+failed = []
+for test in [t.__class__() for t in ratings.ALL_TESTS]:
+    if test.test(data) is False:
+        failed.append([test.__class__.__name__, test.message()])
+output.write(json.dumps(failed))
+"""
+
+
+class _PyromaRun(object):
+    """pyroma running on the project in the background.
+
+    Results are cached on the content of every file pyroma reads, along
+    with everything /setup.py imports. On a cache miss, pyroma is
+    started in a subprocess straight away, so it runs alongside the
+    other linters without taking up a worker in the pool.
+    """
+
+    def __init__(self, setup_file, cache, import_digest):
+        """Start running pyroma on setup_file, unless it is cached."""
+        super(_PyromaRun, self).__init__()
+        self._setup_file = setup_file
+        self._cache = cache
+        self._key = cache.key("_run_pyroma",
+                              sorted(set([setup_file] + _PYROMA_INPUTS)),
+                              import_digest)
+        self._result = cache.get(self._key)
+        self._process = None
+        self._errors = None
+        self._start = time.time()
+        self._start_cpu = sum(os.times()[2:4])
+        self.duration = 0.0
+        self.cpu = 0.0
+
+        if self._result is None:
+            environment = os.environ.copy()
+            environment["PYTHONPATH"] = os.pathsep.join(sys.path)
+            self._errors = tempfile.TemporaryFile()
+            self._process = subprocess.Popen([sys.executable,
+                                              "-c",
+                                              _PYROMA_SCRIPT],
+                                             stdout=subprocess.PIPE,
+                                             stderr=self._errors,
+                                             env=environment)
+
+    @property
+    def cached(self):
+        """Return true if the results came from the cache."""
+        return self._process is None
+
+    def finished(self):
+        """Return true if result() will not block."""
+        return self._process is None or self._process.poll() is not None
+
+    def result(self):
+        """Wait for pyroma to finish and get its messages."""
+        if self._result is not None:
+            return self._result
+
+        output = self._process.communicate()[0]
+        self.duration = time.time() - self._start
+        self.cpu = sum(os.times()[2:4]) - self._start_cpu
+        self._errors.seek(0)
+        errors = self._errors.read().decode("utf-8", "replace")
+        self.close()
+
+        if self._process.returncode != 0:
+            raise DistutilsExecError("""pyroma failed on {0}:\n"""
+                                     """{1}""".format(self._setup_file,
+                                                      errors))
+
+        messages = [
+            _message("pyroma", class_name, self._setup_file, 0, msg)
+            for class_name, msg in json.loads(output.decode("utf-8"))
+        ]
+
+        self._cache.put(self._key, messages)
+        self._result = messages
+        return messages
+
+    def close(self):
+        """Stop pyroma if it is still running and clean up."""
+        if self._process and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+
+        if self._errors:
+            self._errors.close()
+            self._errors = None
+
+
+_BLOCK_REGEXPS = [
+    r"\bpylint:disable=[^\s]*\b",
+    r"\bNOLINT:[^\s]*\b",
+    r"\bNOQA[^\s]*\b",
+    r"\bsuppress\([^\s]*\)"
+]
+
+
+def _file_contents(filename):
+    """Get the contents of filename as text with universal newlines."""
+    from polysquare_setuptools_lint import parsed_files
+
+    lines = parsed_files.get(filename).lines
+    if lines is not None:
+        return "".join(lines)
+
+    with io.open(filename, encoding="utf-8") as found_file:
+        return found_file.read()
+
+
+def _prepare_spelling_dictionary(spellcheck_cache):
+    """Build the dictionary of valid words in spellcheck_cache if stale.
+
+    It is rebuilt when /DICTIONARY changes. Linters sharing the cache
+    in several workers at once would otherwise all rebuild it at the
+    same time, reading each other's partly written files.
+    """
+    graph = os.path.join(spellcheck_cache, "valid_words")
+    user_dictionary = os.path.join(os.getcwd(), "DICTIONARY")
+    if (os.path.exists(graph) and
+            (not os.path.exists(user_dictionary) or
+             os.path.getmtime(user_dictionary) <= os.path.getmtime(graph))):
+        return
+
+    from polysquarelinter import valid_words_dictionary
+
+    valid_words_dictionary.create(spellcheck_cache)
+
+
+def _lint_style(matched_filenames, spellcheck_cache):
+    """Run the polysquare-generic-file-linter checks on matched_filenames.
+
+    Each file is passed straight to the linter's lint function, which
+    returns its errors, instead of through its main function, which
+    reports errors through a module global. Checks run in the same
+    order as main runs them, so the same check fails first on files
+    the linter can't process.
+    """
+    from polysquarelinter import linter as lint
+
+    linter_functions = OrderedDict(sorted(lint.linter_functions_from_filters(),
+                                          key=lambda f: f[0]))
+    options = {
+        "spellcheck_cache": spellcheck_cache,
+        "block_regexps": _BLOCK_REGEXPS
+    }
+
+    messages = list()
+    for filename in matched_filenames:
+        try:
+            errors = lint.lint(os.path.relpath(filename),
+                               _file_contents(filename),
+                               linter_functions,
+                               **options)
+        except RuntimeError as error:
+            messages.append(_message("polysquare-generic-file-linter",
+                                     "polysquarelinter/failure",
+                                     filename,
+                                     0,
+                                     """RuntimeError in processing """
+                                     """{0} - {1}""".format(filename,
+                                                            str(error))))
+            continue
+
+        messages.extend([_message("polysquare-generic-file-linter",
+                                  code,
+                                  filename,
+                                  failure.line,
+                                  failure.description)
+                         for code, failure in errors])
+
+    return messages
+
+
+def _run_polysquare_style_linter(matched_filenames,
+                                 cache,
+                                 cache_dir,
+                                 show_lint_files):
+    """Run polysquare-generic-file-linter on matched_filenames.
+
+    Results are cached per file in cache, along with /DICTIONARY.
+    """
+    for filename in matched_filenames:
+        _debug_linter_status("style-linter", filename, show_lint_files)
+
+    # Arguments are part of the key, so the spelling cache is relative,
+    # as it is in other checkouts.
+    spellcheck_cache = os.path.relpath(os.path.join(cache_dir, "spelling"))
+    dictionary_digest = _file_digest("DICTIONARY")
+    return _cached_batch(cache,
+                         _lint_style,
+                         matched_filenames,
+                         spellcheck_cache,
+                         cache_salts=dict([(f, dictionary_digest)
+                                           for f in matched_filenames]))
+
+
+def _technical_terms(filename):
+    """Get the technical terms used outside of comments in filename.
+
+    These are the symbols which spellcheck-linter allows in markdown
+    files, as polysquare-generic-file-linter would log them. Files
+    which it fails on, such as those without a comment at the top to
+    tell which comment system they use, have no terms.
+    """
+    from polysquarelinter import spelling
+
+    contents = _file_contents(filename).splitlines(True)
+    try:
+        shadow = spelling.spellcheckable_and_shadow_contents(
+            contents,
+            _BLOCK_REGEXPS
+        )[1]
+    except RuntimeError:
+        return list()
+
+    return sorted(spelling.technical_words_from_shadow_contents(shadow))
+
+
+class _TechnicalTerms(object):
+    """The technical terms used in a set of files, merged in memory.
+
+    Each file's terms are kept along with the digest of the contents
+    they came from, so only files which changed since they were last
+    seen are looked up in the cache, or searched for terms again. Each
+    term has a count of the files using it, so the old terms of a
+    changed file are removed without merging every other file again.
+    """
+
+    def __init__(self):
+        """Initialize this _TechnicalTerms with no files."""
+        super(_TechnicalTerms, self).__init__()
+        self._files = dict()
+        self._counts = dict()
+        self._merged = None
+
+    def _remove(self, filename):
+        """Remove the terms in filename."""
+        for term in self._files.pop(filename)[1]:
+            self._counts[term] -= 1
+            if not self._counts[term]:
+                del self._counts[term]
+
+        self._merged = None
+
+    def update(self, cache, filenames):
+        """Bring the terms up to date with the contents of filenames.
+
+        Terms from files which are not in filenames are removed.
+        """
+        for filename in set(self._files.keys()) - set(filenames):
+            self._remove(filename)
+
+        for filename in filenames:
+            digest = _file_digest(filename)
+            known = self._files.get(filename)
+            if known and known[0] == digest:
+                continue
+
+            if known:
+                self._remove(filename)
+
+            terms = _cached_deps(cache, _technical_terms, filename)
+            self._files[filename] = (digest, terms)
+            for term in terms:
+                self._counts[term] = self._counts.get(term, 0) + 1
+
+            self._merged = None
+
+    def merged(self):
+        """Get a digest of all the terms and a set of them."""
+        if self._merged is None:
+            terms = frozenset(self._counts.keys())
+            digest = hashlib.sha1("\n".join(sorted(terms)).encode("utf-8"))
+            self._merged = (digest.hexdigest(), terms)
+
+        return self._merged
+
+
+# Technical terms in this process, kept between jobs and lint runs.
+_TERMS = _TechnicalTerms()
+
+# The salt and the technical words dictionary last built in this process.
+_TECHNICAL_WORDS = [None, None]
+
+
+def _technical_words(salt, words):
+    """Get a spelling Dictionary of words, which salt identifies.
+
+    The dictionary is only built again when salt changes. The previous
+    one is dropped from polysquarelinter's own cache of dictionaries, so
+    long-lived processes don't keep one for every version of the terms.
+    """
+    from polysquarelinter import spelling
+
+    if _TECHNICAL_WORDS[0] != salt:
+        if _TECHNICAL_WORDS[0] is not None:
+            # suppress(protected-access)
+            spelling._spellchecker_cache.pop(
+                "technical_words_" + _TECHNICAL_WORDS[0],
+                None
+            )
+
+        _TECHNICAL_WORDS[:] = [salt,
+                               spelling.Dictionary(words,
+                                                   "technical_words_" + salt)]
+
+    return _TECHNICAL_WORDS[1]
+
+
+def _run_spellcheck_linter(matched_filenames,
+                           py_files,
+                           cache,
+                           cache_dir,
+                           show_lint_files):
+    """Run spellcheck-linter on matched_filenames.
+
+    Technical terms are taken from py_files, with the terms in each
+    file cached separately and merged in memory. Results are cached per
+    file in cache, along with the technical terms and /DICTIONARY.
+    """
+    from polysquarelinter import (lint_spelling_only as lint,
+                                  spelling,
+                                  valid_words_dictionary)
+
+    for filename in matched_filenames:
+        _debug_linter_status("spellcheck-linter", filename, show_lint_files)
+
+    # Files whose terms were not cached are not linted by this job.
+    misses = len(_CACHE_MISSES)
+    _TERMS.update(cache, py_files)
+    del _CACHE_MISSES[misses:]
+
+    terms_digest, terms = _TERMS.merged()
+    salt = "{0}_{1}".format(terms_digest, _file_digest("DICTIONARY"))
+    spellcheck_cache = os.path.relpath(os.path.join(cache_dir, "spelling"))
+
+    def _spellcheck(filenames, spellcheck_cache):
+        """Spellcheck filenames, allowing terms as technical words."""
+        user_words, valid_words = valid_words_dictionary.create(
+            spellcheck_cache
+        )
+        technical_words = _technical_words(salt, user_words | terms)
+        disabled_regions = getattr(lint,
+                                   "_filter_disabled_regions",
+                                   lambda contents: contents)
+
+        messages = list()
+        for filename in filenames:
+            contents = spelling.filter_nonspellcheckable_tokens(
+                _file_contents(filename)
+            )
+            lines = disabled_regions(contents).splitlines(True)
+            for error in spelling.spellcheck_region(lines,
+                                                    valid_words,
+                                                    technical_words,
+                                                    user_words):
+                # suppress(protected-access)
+                desc = lint._SPELLCHECK_MESSAGES[error.error_type].format(
+                    error.word
+                )
+                messages.append(_message("spellcheck-linter",
+                                         "file/spelling_error",
+                                         filename,
+                                         error.line_offset + 1,
+                                         desc))
+
+        return messages
+
+    return _cached_batch(cache,
+                         _spellcheck,
+                         matched_filenames,
+                         spellcheck_cache,
+                         cache_salts=dict([(f, salt)
+                                           for f in matched_filenames]))
+
+
+def _run_markdownlint(matched_filenames):
+    """Run markdownlint on matched_filenames."""
+    try:
+        proc = subprocess.Popen(["mdl"] + matched_filenames,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        lines = proc.communicate()[0].decode().splitlines()
+    except OSError as error:
+        if error.errno == errno.ENOENT:
+            return list()
+
+        raise error
+
+    lines = [
+        re.match(r"([\w\-.\/\\ ]+)\:([0-9]+)\: (\w+) (.+)", l).groups(1)
+        for l in lines
+    ]
+    return [_message("markdownlint", code, filename, int(lineno), msg)
+            for filename, lineno, code, msg in lines]
+
+
+def _run_markdownlint_cached(matched_filenames, cache, show_lint_files):
+    """Run markdownlint on matched_filenames, cached per file in cache.
+
+    Only files which are not cached are passed to mdl. If mdl is not
+    installed, nothing is cached, so that results appear once it is.
+    """
+    from distutils.spawn import find_executable  # suppress(import-error)
+
+    for filename in matched_filenames:
+        _debug_linter_status("mdl", filename, show_lint_files)
+
+    if not find_executable("mdl"):
+        return list()
+
+    # Results also depend on the configuration in /.mdlrc
+    config_digest = _file_digest(".mdlrc")
+    return _cached_batch(cache,
+                         _run_markdownlint,
+                         matched_filenames,
+                         cache_salts=dict([(f, config_digest)
+                                           for f in matched_filenames]))
+
+
+def _run_dodgy(non_test_files, cache, disabled_linters, show_lint_files):
+    """Run dodgy over all non_test_files at once, cached in cache."""
+    for filename in non_test_files:
+        _debug_linter_status("prospector", filename, show_lint_files)
+
+    return _cached_deps(cache,
+                        _run_prospector_on,
+                        non_test_files,
+                        ["dodgy"],
+                        sorted(set(["dodgy"]) & set(disabled_linters)),
+                        cache_salt=_config_digest(_PROSPECTOR_CONFIG_FILES))
+
+
+def _parse_suppressions(suppressions):
+    """Parse a suppressions field and return suppressed codes."""
+    return suppressions[len("suppress("):-1].split(",")
+
+
+def _line_comments(lines, tokens):
+    """Get a dict of line numbers to the comments on those lines.
+
+    Each comment is a pair of its text and whether it is the only thing
+    on its line. If the tokens of a Python file are given, comments are
+    found from them, so that a # in a string does not start a comment.
+    Otherwise, lines are split on the first # in each line instead.
+    """
+    comments = dict()
+
+    if tokens is not None:
+        for token in tokens:
+            if token[0] == tokenize.COMMENT:
+                row, column = token[2]
+                comments.setdefault(row, (token[1],
+                                          not token[4][:column].strip()))
+
+        return comments
+
+    for index, line in enumerate(lines):
+        if "#" in line:
+            comments[index + 1] = ("#" + line.split("#", 1)[1],
+                                   line.strip().startswith("#"))
+
+    return comments
+
+
+class _Suppressions(namedtuple("_Suppressions", "length codes")):
+    """Codes suppressed inline in a file with length lines.
+
+    codes is a dict of line numbers to the codes suppressed on that line,
+    by suppress(CODE1,CODE2) in a comment either at the end of the line
+    or on its own on the line above. Only lines with suppressions are
+    stored. Line zero refers to the last line of the file.
+    """
+
+    def suppressed(self, line, code):
+        """Return true if code is suppressed on line.
+
+        Messages about a whole file have no line and are suppressed on
+        the first line.
+        """
+        # File is zero length, cannot be suppressed
+        if not self.length:
+            return False
+
+        if line is None:
+            line = 1
+
+        # Handle errors which appear after the end of the document.
+        return code in self.codes.get(min(line, self.length), ())
+
+
+def _suppression_index(filename):
+    """Build a _Suppressions index for filename."""
+    from polysquare_setuptools_lint import parsed_files
+
+    parsed = parsed_files.get(filename)
+    if parsed.source is None:
+        return _Suppressions(0, dict())
+
+    lines = parsed.lines
+    if lines is None:
+        with open(filename) as source_file:
+            lines = source_file.readlines()
+
+        tokens = None
+    elif filename.endswith(".py"):
+        tokens = parsed.tokens
+    else:
+        tokens = None
+
+    comments = _line_comments(lines, tokens)
+
+    def _codes(comment):
+        """Get the codes suppressed by comment, which may be None."""
+        if comment:
+            suppressions_function = comment[0].split("#")[1].strip()
+            if suppressions_function.startswith("suppress("):
+                return tuple(_parse_suppressions(suppressions_function))
+
+        return ()
+
+    def _codes_for_line(line, above):
+        """Get codes suppressed on line, or by the comment on above."""
+        if line in comments:
+            return _codes(comments[line])
+
+        above_comment = comments.get(above)
+        if above_comment and above_comment[1]:
+            return _codes(above_comment)
+
+        return ()
+
+    codes = dict()
+    for line in range(len(lines) + 1):
+        # Line zero indexes the last line, but looks above at the first.
+        line_codes = _codes_for_line(line or len(lines), max(1, line - 1))
+        if line_codes:
+            codes[line] = line_codes
+
+    return _Suppressions(len(lines), codes)
+
+
+def _suppressions_for(cache, messages):
+    """Get a dict of _Suppressions for each file in messages."""
+    filenames = set([m.path for m in messages])
+    return dict([(f, _cached_deps(cache, _suppression_index, f))
+                 for f in filenames])
+
+
+def _get_cache_dir(candidate):
+    """Get the current cache directory."""
+    if candidate:
+        return candidate
+
+    import distutils.dist  # suppress(import-error)
+    import distutils.command.build  # suppress(import-error)
+    build_cmd = distutils.command.build.build(distutils.dist.Distribution())
+    build_cmd.finalize_options()
+    cache_dir = os.path.abspath(build_cmd.build_temp)
+
+    # Make sure that it is created before anyone tries to use it
+    try:
+        os.makedirs(cache_dir)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            raise error
+
+    return cache_dir
+
+
+# Directories which never contain files to lint, matched against
+# directory names.
+_PRUNED_DIRECTORIES = [
+    "*.egg",
+    "*.egg-info",
+    "*.eggs",
+    ".git",
+    ".hg",
+    ".nox",
+    ".svn",
+    ".tox",
+    "__pycache__",
+    "node_modules"
+]
+
+
+def _walk_files(start, prune):
+    """Yield the paths of all files below the start directory.
+
+    Directories for which prune returns true are never descended into.
+    Like os.walk, symbolic links to directories are not followed.
+    """
+    if _scandir is None:
+        for root, directories, files in os.walk(start):
+            directories[:] = [d for d in directories
+                              if not prune(os.path.join(root, d))]
+            for filename in files:
+                yield os.path.join(root, filename)
+
+        return
+
+    pending = [start]
+    while pending:
+        try:
+            entries = list(_scandir(pending.pop()))
+        except OSError:
+            continue
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if not prune(entry.path):
+                    pending.append(entry.path)
+            elif entry.is_file():
+                yield entry.path
+
+
+def _is_within(path, directory):
+    """Return true if path is directory or is inside it."""
+    return (path == directory or
+            path.startswith(directory.rstrip(os.sep) + os.sep))
+
+
+def _compile_globs(patterns):
+    """Compile glob patterns into a single regular expression.
+
+    Returns None if there are no patterns. Paths should be normalized
+    with os.path.normcase before matching, as fnmatch does.
+    """
+    if not patterns:
+        return None
+
+    return re.compile("|".join(["(?:{0})".format(fntranslate(
+        os.path.normcase(p))) for p in patterns]))
+
+
+def _translate_ignore_pattern(pattern):
+    """Translate a .gitignore style pattern into a regular expression.
+
+    The expression matches paths relative to the directory containing
+    the ignore file, separated by forward slashes.
+    """
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    regex = ""
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index):
+            regex += "(?:.*/)?"
+            index += 3
+        elif pattern.startswith("**", index):
+            regex += ".*"
+            index += 2
+        elif pattern[index] == "*":
+            regex += "[^/]*"
+            index += 1
+        elif pattern[index] == "?":
+            regex += "[^/]"
+            index += 1
+        elif pattern[index] == "[" and "]" in pattern[index + 2:]:
+            end = pattern.index("]", index + 2)
+            character_class = pattern[index + 1:end].replace("\\", "\\\\")
+            if character_class.startswith("!"):
+                character_class = "^" + character_class[1:]
+
+            regex += "[" + character_class + "]"
+            index = end + 1
+        else:
+            regex += re.escape(pattern[index])
+            index += 1
+
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+
+    return re.compile(regex + r"\Z")
+
+
+class _IgnoreRules(object):
+    """Rules read from .gitignore style files, in order.
+
+    As with git, the last rule matching a path decides whether it is
+    ignored and nothing inside an ignored directory can be re-included.
+    """
+
+    def __init__(self, lines):
+        """Parse rules from lines."""
+        super(_IgnoreRules, self).__init__()
+        self._rules = list()
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+
+            negated = line.startswith("!")
+            if negated or line.startswith("\\"):
+                line = line[1:]
+
+            directory_only = line.endswith("/")
+            self._rules.append((_translate_ignore_pattern(line.rstrip("/")),
+                                negated,
+                                directory_only))
+
+        # Most paths match no rule at all, so check them all at once
+        # before going through the rules in order.
+        self._any = re.compile("|".join(["(?:{0})".format(r[0].pattern)
+                                         for r in self._rules]) or "(?!)")
+
+    def __bool__(self):
+        """Return true if there are any rules."""
+        return bool(self._rules)
+
+    __nonzero__ = __bool__
+
+    def _ignored(self, relative_path, is_directory):
+        """Return true if the rules ignore relative_path itself."""
+        if not self._any.match(relative_path):
+            return False
+
+        ignored = False
+        for regex, negated, directory_only in self._rules:
+            if directory_only and not is_directory:
+                continue
+
+            if regex.match(relative_path):
+                ignored = not negated
+
+        return ignored
+
+    def ignores(self, relative_path, is_directory):
+        """Return true if relative_path or any directory above it is ignored.
+
+        relative_path is separated by forward slashes.
+        """
+        parts = relative_path.split("/")
+        for index in range(1, len(parts)):
+            if self._ignored("/".join(parts[:index]), True):
+                return True
+
+        return self._ignored(relative_path, is_directory)
+
+
+def _read_ignore_rules(filenames):
+    """Read _IgnoreRules from each of filenames that exists, in order."""
+    lines = list()
+    for filename in filenames:
+        try:
+            with open(filename) as ignore_file:
+                lines.extend(ignore_file.readlines())
+        except (IOError, OSError):
+            continue
+
+    return _IgnoreRules(lines)
+
+
+class _Exclusions(object):
+    """Matches files and directories which are excluded from linting.
+
+    Glob patterns are compiled once into a single regular expression and
+    matched against absolute paths. Ignore rules are matched against
+    paths relative to the current directory.
+    """
+
+    def __init__(self, patterns, ignore_rules):
+        """Compile patterns and keep ignore_rules."""
+        super(_Exclusions, self).__init__()
+        self._cwd = os.getcwd()
+        self._files = _compile_globs(patterns)
+
+        # Only patterns ending in a wildcard can be known to exclude every
+        # file below a directory.
+        self._directories = _compile_globs([p for p in patterns
+                                            if p.endswith("*")])
+        self._ignore_rules = ignore_rules
+
+    def _ignored(self, path, is_directory):
+        """Return true if path is ignored by the ignore rules."""
+        if not self._ignore_rules:
+            return False
+
+        relative_path = os.path.relpath(path, self._cwd)
+        if relative_path.split(os.sep)[0] == os.pardir:
+            return False
+
+        return self._ignore_rules.ignores(relative_path.replace(os.sep, "/"),
+                                          is_directory)
+
+    def excludes_file(self, path):
+        """Return true if the file at path is excluded."""
+        return (bool(self._files and
+                     self._files.match(os.path.normcase(path))) or
+                self._ignored(path, False))
+
+    def excludes_directory(self, path):
+        """Return true if every file below the directory path is excluded."""
+        return (bool(self._directories and
+                     self._directories.match(os.path.normcase(path) +
+                                             os.sep)) or
+                self._ignored(path, True))
+
+
+# Files which affect the results of pyroma.
+_PYROMA_INPUTS = [
+    "MANIFEST.in",
+    "README",
+    "README.md",
+    "README.rst",
+    "README.txt",
+    "setup.cfg",
+    "setup.py"
+]
+
+
+def _git_changed_files(changed_since, staged):
+    """Get the real paths of files changed since changed_since.
+
+    If staged is true, only files staged in the index are considered.
+    Otherwise untracked files are considered changed as well.
+    """
+    def _git(*args):
+        """Run git with args and return its output lines."""
+        proc = subprocess.Popen(["git"] + list(args),
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        output, error = proc.communicate()
+        if proc.returncode != 0:
+            raise DistutilsExecError("""git {0} failed: """
+                                     """{1}""".format(" ".join(args),
+                                                      error.decode()))
+
+        return output.decode().splitlines()
+
+    toplevel = _git("rev-parse", "--show-toplevel")[0]
+    diff = ["diff", "--name-only", "--diff-filter=ACMRT"]
+    if staged:
+        diff.append("--cached")
+
+    if changed_since:
+        diff.append(changed_since)
+
+    changed = _git(*diff)
+    if not staged:
+        changed += _git("ls-files",
+                        "--others",
+                        "--exclude-standard",
+                        "--full-name")
+
+    return set([os.path.realpath(os.path.join(toplevel, f))
+                for f in changed])
+
+
+# Modules imported up front by long-lived processes, so that linting
+# does not pay for importing them.
+_LINTER_MODULES = [
+    "astroid",
+    "flake8.engine",
+    "pep257",
+    "pep8",
+    "polysquarelinter.lint_spelling_only",
+    "polysquarelinter.linter",
+    "prospector.formatters.pylint",
+    "prospector.message",
+    "prospector.run",
+    "pylint.lint",
+    "pyroma.projectdata",
+    "pyroma.ratings"
+]
+
+
+def _preload_linters():
+    """Import all linter modules that can be imported."""
+    import importlib
+
+    for module in _LINTER_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            continue
+
+
+def _initialize_worker():
+    """Set up a worker process before it runs any jobs.
+
+    Linters are imported once, when the worker starts, if they were
+    not inherited from the parent already. pep257's info logging is
+    silenced for the worker's whole life, as _patched_pep257 does in
+    the parent.
+
+    An exception here would make the pool start new workers forever,
+    so a missing pep257 is left for the jobs that use it to report.
+    """
+    _preload_linters()
+    try:
+        import pep257
+    except ImportError:
+        return
+
+    if getattr(pep257, "log", None):
+        pep257.log.info = _discard_log  # suppress(unused-attribute)
+
+
+def _create_pool(jobs):
+    """Create a pool of jobs workers, which start with linters loaded.
+
+    Linters are imported here before the workers are forked, so that
+    they share the parent's imported modules instead of each importing
+    them on their first job.
+    """
+    _preload_linters()
+    return multiprocessing.Pool(jobs, _initialize_worker)
+
+
+class _Job(namedtuple("_Job", "linter func item args")):
+    """A linter job, calling func with item and args.
+
+    The item is either a file or a list of files.
+    """
+
+
+# The digest of /DICTIONARY when polysquarelinter last read it here.
+_USER_DICTIONARY_DIGEST = [None]
+
+
+def _forget_stale_spelling():
+    """Forget polysquarelinter's words if /DICTIONARY changed.
+
+    polysquarelinter caches the valid words, which include the words in
+    /DICTIONARY, and their spellcheckers in module globals keyed on the
+    path to /DICTIONARY, not its contents.
+    """
+    digest = _file_digest("DICTIONARY")
+    if _USER_DICTIONARY_DIGEST[0] == digest:
+        return
+
+    _USER_DICTIONARY_DIGEST[0] = digest
+    try:
+        from polysquarelinter import spelling
+    except ImportError:
+        return
+
+    # Clearing the caches closes the technical words dictionary too.
+    spelling.clear_caches()
+    _TECHNICAL_WORDS[:] = [None, None]
+
+
+def _start_generation(generation):
+    """Forget what earlier lint runs in this process read and parsed.
+
+    parsed_files forgets the files itself. astroid caches the tree of
+    every module pylint analyses, keyed on its name and path but not its
+    contents, along with the path each module name was found at. Processes
+    which outlive a single run, like the daemon and its workers, would
+    otherwise check old trees of edited files and miss new modules.
+    Spelling dictionaries are built again if /DICTIONARY changed.
+
+    Strings shared between messages are forgotten too, so that they
+    don't pile up over every run.
+    """
+    from polysquare_setuptools_lint import parsed_files
+
+    if not parsed_files.reset(generation):
+        return
+
+    _INTERNED.clear()
+    _forget_stale_spelling()
+
+    try:
+        import astroid
+    except ImportError:
+        return
+
+    # clear_cache builds the builtins module again, which inference
+    # relies on being in the cache.
+    astroid.MANAGER.clear_cache()
+    getattr(astroid.MANAGER, "_mod_file_cache", dict()).clear()
+
+
+def _run_job(indexed_job):
+    """Run the job in the (index, job) pair indexed_job and time it.
+
+    Returns the index, the result, a dict of _Suppressions for each file
+    with messages in the result, the time taken, the CPU time taken,
+    including by subprocesses, the files that were not cached and, if the
+    job raised an exception, the exception and its formatted traceback.
+    """
+    index, job, cache, generation = indexed_job
+    _start_generation(generation)
+    del _CACHE_MISSES[:]
+    start = time.time()
+    start_cpu = sum(os.times()[:4])
+    suppressions = dict()
+    try:
+        result = job.func(job.item, *job.args)
+        error = None
+    except Exception as exception:  # suppress(broad-except,B901)
+        result = None
+        error = (exception, traceback.format_exc())
+
+    duration = time.time() - start
+    cpu = sum(os.times()[:4]) - start_cpu
+    linted = list(_CACHE_MISSES)
+
+    # Build suppression indices for files with messages here too, so
+    # that the main process never has to read them.
+    if result:
+        suppressions = _suppressions_for(cache, result)
+
+    return (index, result, suppressions, duration, cpu, linted, error)
+
+
+def _files_in(item):
+    """Get the files in item, which is either a file or a list of them."""
+    if isinstance(item, list):
+        return item
+
+    return [item]
+
+
+def _load_json(path, default):
+    """Load JSON from path, returning default if path is None or invalid."""
+    if path:
+        try:
+            with open(path) as json_file:
+                return json.load(json_file)
+        except (IOError, OSError, ValueError):
+            return default
+
+    return default
+
+
+def _last_modified(filename):
+    """Get the modification time of filename, or zero if it is missing."""
+    try:
+        return os.path.getmtime(filename)
+    except OSError:
+        return 0
+
+
+def _failure_priority(failed_files):
+    """Get a function to prioritise files which are most likely to fail.
+
+    Files which failed on the last run come first, then files which were
+    modified most recently.
+    """
+    def _priority(filenames):
+        """Get the priority of a job linting filenames."""
+        return max([(f in failed_files, _last_modified(f))
+                    for f in filenames] or [(False, 0)])
+
+    return _priority
+
+
+class _Timings(object):
+    """Durations of linters on each file, recorded over previous runs.
+
+    Durations are only recorded for files which were actually linted,
+    rather than fetched from the cache. Files without a recorded duration
+    are estimated from their size. Files are recorded by their paths
+    relative to the current directory, so that timings still apply
+    after a checkout moves.
+    """
+
+    def __init__(self, path):
+        """Load timings from path, which may be None."""
+        super(_Timings, self).__init__()
+        self._path = path
+        self._durations = _load_json(path, dict())
+
+    def estimate(self, linter, filenames):
+        """Estimate how long linter will take to run on filenames."""
+        durations = self._durations.get(linter, dict())
+        estimate = 0.0
+        for filename in filenames:
+            try:
+                estimate += durations[os.path.relpath(filename)]
+            except KeyError:
+                try:
+                    estimate += 0.001 + os.path.getsize(filename) * 0.00001
+                except OSError:
+                    continue
+
+        return estimate
+
+    def record(self, linter, filenames, duration):
+        """Record that linter took duration to lint filenames.
+
+        The duration is split between filenames by their estimates.
+        """
+        if not filenames:
+            return
+
+        estimates = [self.estimate(linter, [f]) for f in filenames]
+        total = sum(estimates) or 1.0
+        durations = self._durations.setdefault(linter, dict())
+        for filename, estimate in zip(filenames, estimates):
+            share = duration * (estimate / total)
+            durations[os.path.relpath(filename)] = share
+
+    def save(self, filenames):
+        """Save timings back to where they were loaded from.
+
+        Only the timings of filenames are kept, so that timings of files
+        which were deleted or moved are forgotten.
+        """
+        if not self._path:
+            return
+
+        kept = set([os.path.relpath(f) for f in filenames])
+        durations = dict([
+            (linter, dict([(f, d) for f, d in by_file.items() if f in kept]))
+            for linter, by_file in self._durations.items()
+        ])
+        _replace_file(self._path, json.dumps(durations).encode("utf-8"))
+
+
+class _Profile(object):
+    """Wall time, CPU time and cache hits of each linter on each file.
+
+    A job which lints several files at once has its times split evenly
+    between the files which were not cached. Cached files take no time.
+    """
+
+    def __init__(self):
+        """Initialize this _Profile with no entries."""
+        super(_Profile, self).__init__()
+        self.entries = list()
+
+    def record(self, linter, filenames, linted, duration, cpu):
+        """Record that linter took duration and cpu on filenames.
+
+        linted are the files which were not cached. Jobs which miss
+        the cache on files they don't lint, such as pyroma reading the
+        README, count as a miss on all of their files.
+        """
+        # Jobs without files are recorded against an empty filename.
+        filenames = filenames or [""]
+        missed = [f for f in filenames if f in linted]
+        if (linted or filenames == [""]) and not missed:
+            missed = filenames
+
+        for filename in filenames:
+            cached = filename not in missed
+            share = 0.0 if cached else 1.0 / len(missed)
+            self.entries.append({
+                "linter": linter,
+                "file": os.path.relpath(filename) if filename else "",
+                "wall": duration * share,
+                "cpu": cpu * share,
+                "cached": cached
+            })
+
+    def linters(self):
+        """Get totals of each field for each linter."""
+        totals = dict()
+        for entry in self.entries:
+            total = totals.setdefault(entry["linter"], {
+                "wall": 0.0,
+                "cpu": 0.0,
+                "hits": 0,
+                "misses": 0
+            })
+            total["wall"] += entry["wall"]
+            total["cpu"] += entry["cpu"]
+            total["hits" if entry["cached"] else "misses"] += 1
+
+        return totals
+
+    def table(self, top):
+        """Render the top slowest (linter, file) pairs and linter totals."""
+        row = "{0:<32} {1:<40} {2:>8} {3:>8} {4:>6}\n"
+        lines = [row.format("Linter", "File", "Wall", "CPU", "Cache")]
+        for entry in sorted(self.entries,
+                            key=lambda e: e["wall"],
+                            reverse=True)[:top]:
+            lines.append(row.format(entry["linter"],
+                                    entry["file"],
+                                    "{0:.3f}".format(entry["wall"]),
+                                    "{0:.3f}".format(entry["cpu"]),
+                                    "hit" if entry["cached"] else "miss"))
+
+        lines.append("\n")
+        row = "{0:<32} {1:>8} {2:>8} {3:>6} {4:>6}\n"
+        lines.append(row.format("Linter", "Wall", "CPU", "Hits", "Misses"))
+        totals = self.linters()
+        for linter in sorted(totals.keys(),
+                             key=lambda name: totals[name]["wall"],
+                             reverse=True):
+            lines.append(row.format(linter,
+                                    "{0:.3f}".format(totals[linter]["wall"]),
+                                    "{0:.3f}".format(totals[linter]["cpu"]),
+                                    totals[linter]["hits"],
+                                    totals[linter]["misses"]))
+
+        return "".join(lines)
+
+    def save(self, path):
+        """Save a JSON report of all entries and linter totals to path."""
+        _ensure_directory(os.path.dirname(os.path.abspath(path)))
+        _replace_file(path, json.dumps({
+            "entries": self.entries,
+            "linters": self.linters()
+        }, indent=2, sort_keys=True).encode("utf-8"))
+
+
+# Number of (linter, file) pairs shown by --profile-linters.
+_PROFILE_TOP = 20
+
+
+class _Scheduler(object):
+    """Runs linter jobs over a pool of workers, longest jobs first.
+
+    Jobs are put on the pool's queue one at a time, ordered by their
+    expected duration. Idle workers take the next job from the queue,
+    so one slow file landing last cannot leave the other workers idle
+    for long. Only a few jobs per worker are queued at once, so jobs
+    which were not queued yet never run if the caller stops early.
+    """
+
+    def __init__(self, pool, jobs, timings, cache, profile=None):
+        """Initialize this _Scheduler with pool, which may be None.
+
+        If profile is given, each job is recorded in it.
+        """
+        super(_Scheduler, self).__init__()
+        self._pool = pool
+        self._cache = cache
+        self.profile = profile
+
+        # Files read by the last scheduler are read again by this one.
+        self.generation = "{0}-{1}".format(os.getpid(), time.time())
+        self._timings = timings
+        self.jobs = jobs
+
+    def batches(self, linter, filenames):
+        """Split filenames into batches of similar expected duration.
+
+        The slowest files get batches of their own. Without a pool,
+        everything goes into a single batch. There are no batches at
+        all if there are no files.
+        """
+        if not filenames:
+            return list()
+
+        if not self._pool:
+            return [filenames]
+
+        costs = dict([(f, self._timings.estimate(linter, [f]))
+                      for f in filenames])
+        target = sum(costs.values()) / (self.jobs * 4)
+        batches = list()
+        batch_cost = 0.0
+        for filename in sorted(filenames, key=lambda f: (-costs[f], f)):
+            if not batches or batch_cost + costs[filename] > target:
+                batches.append(list())
+                batch_cost = 0.0
+
+            batches[-1].append(filename)
+            batch_cost += costs[filename]
+
+        return batches
+
+    def _queued(self, indexed_jobs):
+        """Run indexed_jobs in the pool, yielding results as each finishes."""
+        finished = Queue()
+        pending = dict()
+        remaining = list(reversed(indexed_jobs))
+
+        while remaining or pending:
+            while remaining and len(pending) < self.jobs * 2:
+                indexed_job = remaining.pop()
+                pending[indexed_job[0]] = self._pool.apply_async(
+                    _run_job,
+                    (indexed_job, ),
+                    callback=finished.put
+                )
+
+            try:
+                completed = finished.get(timeout=0.1)
+            except Empty:
+                # Re-raise errors which happened outside of _run_job,
+                # such as a result which could not be pickled.
+                for result in pending.values():
+                    if result.ready() and not result.successful():
+                        result.get()
+
+                continue
+
+            del pending[completed[0]]
+            yield completed
+
+    def run(self, jobs, priority=None):
+        """Run jobs, yielding (index, result, suppressions) as each finishes.
+
+        Jobs run longest first, unless priority is given, in which case
+        it is called with the files in each job and the jobs with the
+        highest priority run first.
+
+        If a job raises an exception, it is re-raised here.
+        """
+        def _order(index):
+            """Get a sort key for running jobs[index]."""
+            files = _files_in(jobs[index].item)
+            estimate = self._timings.estimate(jobs[index].linter, files)
+            if priority:
+                return (priority(files), estimate)
+
+            return estimate
+
+        order = sorted(range(len(jobs)), key=_order, reverse=True)
+        indexed_jobs = [(i, jobs[i], self._cache, self.generation)
+                        for i in order]
+
+        if self._pool:
+            completed = self._queued(indexed_jobs)
+        else:
+            completed = (_run_job(j) for j in indexed_jobs)
+
+        for completed_job in completed:
+            index, result, suppressions, duration, cpu, linted, error = (
+                completed_job
+            )
+            if error:
+                sys.stderr.write(error[1])
+                sys.stderr.write("""Encountered error '{}' whilst """
+                                 """running {}""".format(str(error[0]),
+                                                         jobs[index].linter))
+                raise error[0]
+
+            self._timings.record(jobs[index].linter, linted, duration)
+            if self.profile:
+                self.profile.record(jobs[index].linter,
+                                    _files_in(jobs[index].item),
+                                    linted,
+                                    duration,
+                                    cpu)
+
+            yield index, result, suppressions
+
+
+def _daemon_socket_path(cache_directory):
+    """Get the path to the daemon socket for cache_directory.
+
+    Unix domain socket paths are limited to around 100 characters, so
+    fall back to a hashed name in the temporary directory for deep
+    cache directories.
+    """
+    socket_path = os.path.join(cache_directory,
+                               "polysquare_setuptools_lint",
+                               "daemon.sock")
+    if len(socket_path) < 100:
+        return socket_path
+
+    digest = hashlib.sha1(socket_path.encode("utf-8")).hexdigest()
+    return os.path.join(tempfile.gettempdir(),
+                        "polysquare-lint-{0}.sock".format(digest[:16]))
+
+
+# Options which are forwarded from the client to the daemon. File
+# discovery and exclusions are handled by the client.
+_DAEMON_OPTIONS = [
+    "disable_linters",
+    "fail_fast",
+    "format",
+    "profile_linters",
+    "show_lint_files",
+    "stamp_directory",
+    "summary",
+    "suppress_codes"
+]
+
+
+def _suppressed(command, suppressions, line, code):
+    """Return true if linter error code is suppressed.
+
+    Codes are suppressed globally by the suppress-codes option or
+    inline by suppress(CODE1,CODE2,CODE3) etc, as recorded in the
+    _Suppressions index for the file.
+    """
+    if code in command.suppress_codes:
+        return True
+
+    return suppressions.suppressed(line, code)
+
+
+def _get_files_to_lint(command, external_directories):
+    """Get Python files to lint and markdown files to lint.
+
+    Both are found in a single walk of the current directory, which
+    never descends into excluded directories.
+    """
+    cwd = os.getcwd()
+    ignore_files = [os.path.join(cwd, ".lintignore")]
+    if command.use_gitignore:
+        ignore_files.insert(0, os.path.join(cwd, ".gitignore"))
+
+    ignore_rules = _read_ignore_rules(ignore_files)
+    py_patterns = [
+        "*.egg/*",
+        "*.eggs/*"
+    ] + command.exclusions
+    py_exclusions = _Exclusions(py_patterns, ignore_rules)
+    md_exclusions = _Exclusions(py_patterns + ["*build/*"], ignore_rules)
+    pruned_directories = _compile_globs(_PRUNED_DIRECTORIES)
+
+    py_roots = [os.path.abspath(d) for d in external_directories]
+    packages = command.distribution.packages or list()
+    py_roots.extend([os.path.join(cwd, *p.split(".")) for p in packages])
+
+    def _prune(directory):
+        """Return true if no files below directory need linting."""
+        name = os.path.normcase(os.path.basename(directory))
+        if pruned_directories.match(name):
+            return True
+
+        if not md_exclusions.excludes_directory(directory):
+            return False
+
+        return (py_exclusions.excludes_directory(directory) or
+                not any([_is_within(directory, r) or
+                         _is_within(r, directory) for r in py_roots]))
+
+    py_files = []
+    md_files = []
+    for filename in _walk_files(cwd, _prune):
+        if filename.endswith(".md"):
+            md_files.append(filename)
+        elif (filename.endswith(".py") and
+              any([_is_within(filename, r) for r in py_roots])):
+            py_files.append(filename)
+
+    for root in py_roots:
+        if not _is_within(root, cwd):
+            py_files.extend([f for f in _walk_files(root, _prune)
+                             if f.endswith(".py")])
+
+    py_modules = command.distribution.py_modules or list()
+    for filename in py_modules:
+        py_files.append(os.path.realpath(filename + ".py"))
+
+    py_files.append(os.path.join(cwd, "setup.py"))
+
+    # Remove duplicates which may exist due to symlinks or repeated
+    # packages found by /setup.py
+    py_files = list(set([os.path.realpath(f) for f in py_files]))
+
+    return (sorted([f for f in py_files
+                    if not py_exclusions.excludes_file(f)]),
+            sorted([f for f in md_files
+                    if not md_exclusions.excludes_file(f)]))
+
+
+def _message_order(message):
+    """Get a key to sort message by all of its fields.
+
+    Fields which may be None sort as if they were zero or empty.
+    """
+    return (message.path,
+            message.line or 0,
+            message.code,
+            message.source,
+            message.character or 0,
+            message.function or "",
+            message.text)
+
+
+class _ReportOrder(object):
+    """Holds back messages until earlier jobs on their files finish.
+
+    Jobs are in a fixed order of linters. When linters in different jobs
+    report messages with the same key, the message from the earliest job
+    is always released first, whichever job finishes first. If hold is
+    false, messages are released as soon as their job finishes.
+    """
+
+    def __init__(self, jobs, hold):
+        """Initialize this _ReportOrder for jobs."""
+        super(_ReportOrder, self).__init__()
+        self._hold = hold
+        self._job_files = [_files_in(job.item) for job in jobs]
+        self._file_jobs = dict()
+        for index, filenames in enumerate(self._job_files):
+            for filename in filenames:
+                self._file_jobs.setdefault(filename, list()).append(index)
+
+        self._pending = set(range(len(jobs)))
+        self._held = dict()
+        self._suppressions = dict()
+
+    def _first_pending(self, filename):
+        """Get the index of the first unfinished job on filename, if any."""
+        for index in self._file_jobs.get(filename, ()):
+            if index in self._pending:
+                return index
+
+        return None
+
+    def release(self, index, result, suppressions):
+        """Record that the job at index finished with result.
+
+        Returns the index, the messages which can now be reported, in the
+        order of their jobs, and a dict of _Suppressions for their files.
+        Jobs not passed to the constructor, like pyroma, come last.
+        """
+        self._pending.discard(index)
+        self._suppressions.update(suppressions)
+        messages = [(index, m) for m in sorted(result or (),
+                                               key=_message_order)]
+        if not self._hold:
+            return index, [m for _, m in messages], suppressions
+
+        for job_index, message in messages:
+            self._held.setdefault(message.path, list()).append((job_index,
+                                                                message))
+
+        if index < len(self._job_files):
+            filenames = set(self._job_files[index])
+        else:
+            filenames = set()
+
+        released = list()
+        for filename in filenames | set([m.path for _, m in messages]):
+            first_pending = self._first_pending(filename)
+            held = self._held.pop(filename, list())
+            ready = [h for h in held
+                     if first_pending is None or h[0] < first_pending]
+            waiting = [h for h in held
+                       if first_pending is not None and h[0] >= first_pending]
+            if waiting:
+                self._held[filename] = waiting
+
+            released.extend(ready)
+
+        released.sort(key=lambda h: (h[0], _message_order(h[1])))
+        return (index,
+                [m for _, m in released],
+                dict([(m.path, self._suppressions[m.path])
+                      for _, m in released]))
+
+
+# suppress(too-many-arguments)
+def _map_over_linters(command,
+                      py_files,
+                      non_test_files,
+                      md_files,
+                      project_files,
+                      cache,
+                      scheduler,
+                      priority):
+    """Run linters over files, yielding (index, results, suppressions).
+
+    All linters run at the same time in the scheduler's pool and
+    results are yielded as each job finishes. The index is the
+    position of the job in a fixed order of linters. priority is
+    passed on to the scheduler.
+
+    Messages on each file are held back until every earlier linter on
+    the file finished, so that the same message is always picked from
+    messages with the same key. In fail-fast mode, they are yielded
+    straight away instead.
+
+    project_files are all of the Python files in the project, of which
+    py_files may only be some, as with --changed-since.
+    """
+    # Files which are not being linted still change the results of
+    # the files which import them, so follow imports through all of
+    # the project's files.
+    if cache.directory is not None:
+        import_digests = _import_digests(project_files,
+                                         os.path.join(cache.directory,
+                                                      "imports.json"))
+    else:
+        import_digests = dict()
+
+    # Prospector checks get handled on a case sub-linter by sub-linter
+    # basis internally, so always run prospector.
+    #
+    # vulture should be added again once issue 180 is fixed.
+    jobs = [
+        _Job("prospector",
+             _run_prospector,
+             batch,
+             (cache,
+              command.disable_linters,
+              dict([(f, import_digests.get(f)) for f in batch]),
+              command.show_lint_files))
+        for batch in scheduler.batches("prospector", py_files)
+    ]
+
+    # Only tests or markdown files may have changed, with --changed-since.
+    if non_test_files:
+        jobs.append(_Job("dodgy",
+                         _run_dodgy,
+                         non_test_files,
+                         (cache,
+                          command.disable_linters,
+                          command.show_lint_files)))
+
+    if "flake8" not in command.disable_linters:
+        jobs += [
+            _Job("flake8",
+                 _run_flake8,
+                 batch,
+                 (cache, command.disable_linters, command.show_lint_files))
+            for batch in scheduler.batches("flake8", py_files)
+        ]
+
+    # Each batch of markdown files is linted by its own mdl process.
+    if "mdl" not in command.disable_linters:
+        jobs += [
+            _Job("mdl",
+                 _run_markdownlint_cached,
+                 batch,
+                 (cache, command.show_lint_files))
+            for batch in scheduler.batches("mdl", md_files)
+        ]
+
+    if not set(["polysquare-generic-file-linter",
+                "spellcheck-linter"]).issubset(command.disable_linters):
+        _prepare_spelling_dictionary(os.path.join(command.cache_directory,
+                                                  "spelling"))
+
+    if "polysquare-generic-file-linter" not in command.disable_linters:
+        jobs += [
+            _Job("polysquare-generic-file-linter",
+                 _run_polysquare_style_linter,
+                 batch,
+                 (cache, command.cache_directory, command.show_lint_files))
+            for batch in scheduler.batches("polysquare-generic-file-linter",
+                                           py_files)
+        ]
+
+    # spellcheck-linter finds technical terms itself, so it doesn't
+    # wait for polysquare-generic-file-linter to log them. Terms come
+    # from every Python file, since markdown files may use terms from
+    # any of them, whichever files are being linted.
+    if "spellcheck-linter" not in command.disable_linters:
+        jobs += [
+            _Job("spellcheck-linter",
+                 _run_spellcheck_linter,
+                 batch,
+                 (project_files,
+                  cache,
+                  command.cache_directory,
+                  command.show_lint_files))
+            for batch in scheduler.batches("spellcheck-linter", md_files)
+        ]
+
+    # pyroma runs /setup.py in a subprocess of its own, started
+    # before any other linter, and is reported once it finishes.
+    if "pyroma" not in command.disable_linters:
+        _debug_linter_status("pyroma", "setup.py", command.show_lint_files)
+        pyroma = _PyromaRun("setup.py",
+                            cache,
+                            import_digests.get(os.path.realpath(
+                                "setup.py"
+                            )))
+    else:
+        pyroma = None
+
+    def _pyroma_result():
+        """Get the result of pyroma and record it in the profile."""
+        result = pyroma.result()
+        if scheduler.profile:
+            scheduler.profile.record("pyroma",
+                                     ["setup.py"],
+                                     [] if pyroma.cached else ["setup.py"],
+                                     pyroma.duration,
+                                     pyroma.cpu)
+
+        return (len(jobs), result, _suppressions_for(cache, result))
+
+    order = _ReportOrder(jobs, not command.fail_fast)
+    try:
+        for index, result, suppressions in scheduler.run(jobs, priority):
+            yield order.release(index, result, suppressions)
+
+            if pyroma and pyroma.finished():
+                yield order.release(*_pyroma_result())
+                pyroma = None
+
+        if pyroma:
+            yield order.release(*_pyroma_result())
+    finally:
+        if pyroma:
+            pyroma.close()
+
+
+# suppress(too-many-arguments)
+def _lint(command,
+          files,
+          md_files,
+          project_files,
+          pool,
+          jobs,
+          writer,
+          write_errors=None):
+    """Lint files and md_files, returning the unsuppressed messages.
+
+    project_files are all of the Python files in the project, of which
+    files may only be some. Linters are run in pool, which has jobs
+    workers, or in this process if pool is None. Unsuppressed messages
+    are passed to writer as soon as the job which found them finishes.
+    Other output, such as the profile of each linter, is passed to
+    write_errors, which writes to stderr by default.
+
+    Returns the number of unsuppressed messages and a list of them.
+    Only the text summary needs every message once linting finishes,
+    so the list is empty unless one was requested.
+    """
+    cwd = os.getcwd()
+    count = 0
+    messages = []
+    keep_messages = command.format == "text" and command.summary
+
+    with _patched_pep257():
+        # Certain checks, such as vulture and pyroma cannot be
+        # meaningfully split up between files (vulture requires all
+        # files to be passed to the linter, pyroma can only be run
+        # on /setup.py, etc), so they run as a single job.
+        non_test_files = [f for f in files if not _file_is_test(f)]
+        if command.stamp_directory:
+            stamp_directory = command.stamp_directory
+        else:
+            stamp_directory = os.path.join(command.cache_directory,
+                                           "polysquare_setuptools_lint",
+                                           "results")
+
+        cache = _result_cache(stamp_directory)
+        if cache.directory is not None:
+            timings = _Timings(os.path.join(stamp_directory,
+                                            "timings.json"))
+            failures_path = os.path.join(stamp_directory,
+                                         "failures.json")
+        else:
+            timings = _Timings(None)
+            failures_path = None
+
+        # Files which had messages on the last run are linted first
+        # in fail-fast mode, since they are the most likely to fail.
+        previous_failures = set(_load_json(failures_path, list()))
+        if command.fail_fast:
+            priority = _failure_priority(previous_failures)
+        else:
+            priority = None
+
+        if command.profile_linters:
+            profile = _Profile()
+        else:
+            profile = None
+
+        scheduler = _Scheduler(pool, jobs, timings, cache, profile)
+        _start_generation(scheduler.generation)
+        failures = set()
+        stopped_early = False
+
+        # This will ensure that we don't repeat messages. Only the
+        # first message released for each key, which is from the
+        # earliest linter reporting it, is kept.
+        reported_keys = set()
+        results = _map_over_linters(command,
+                                    files,
+                                    non_test_files,
+                                    md_files,
+                                    project_files,
+                                    cache,
+                                    scheduler,
+                                    priority)
+        for _, subset, suppressions in results:
+            # Keys are unique once each key's first message is
+            # picked, so sorting never compares more than the key.
+            # Messages about a whole file have no line and sort first,
+            # as prospector sorts them.
+            by_key = dict()
+            for message in subset:
+                by_key.setdefault(message[:3], message)
+
+            new_messages = []
+            for key in sorted(by_key.keys(),
+                              key=lambda k: (k[0], k[1] or 0, k[2])):
+                if key in reported_keys:
+                    continue
+
+                reported_keys.add(key)
+                message = by_key[key]
+                if not _suppressed(command,
+                                   suppressions[message.path],
+                                   message.line,
+                                   message.code):
+                    failures.add(message.path)
+                    new_messages.append(message._replace(
+                        path=os.path.relpath(message.path, cwd)
+                    ))
+
+            if new_messages:
+                writer.write(new_messages)
+                count += len(new_messages)
+                if keep_messages:
+                    messages.extend(new_messages)
+
+                if command.fail_fast:
+                    stopped_early = True
+                    break
+
+        timings.save(project_files + md_files)
+
+        if profile:
+            (write_errors or sys.stderr.write)(profile.table(_PROFILE_TOP))
+            profile.save(command.profile_linters)
+
+        # Files which were not linted, or not linted to completion,
+        # keep their status from previous runs.
+        if stopped_early:
+            failures |= previous_failures
+        else:
+            failures |= previous_failures - set(files + md_files)
+
+        if failures_path:
+            _replace_file(failures_path,
+                          json.dumps(sorted(failures)).encode("utf-8"))
+
+    return count, messages
+
+
+def _handle_daemon_request(command, request, write, workers):
+    """Lint the files in a request sent to the daemon.
+
+    Output is sent to the client with write as soon as it is found.
+    """
+    if request["cwd"] != os.getcwd():
+        return {
+            "output": """Daemon is serving {0}, """
+                      """not {1}\n""".format(os.getcwd(),
+                                             request["cwd"]),
+            "status": 1
+        }
+
+    for option in _DAEMON_OPTIONS:
+        setattr(command, option, request["options"][option])
+
+    from polysquare_setuptools_lint import output
+
+    # Output for stderr is sent back along with the response, so that
+    # the client writes it to its own stderr.
+    errors = []
+    writer = output.create(command.format, write, command.summary)
+    writer.start()
+    count, messages = _lint(command,
+                            request["files"],
+                            request["md_files"],
+                            request["project_files"],
+                            workers.pool,
+                            workers.jobs,
+                            writer,
+                            errors.append)
+    writer.finish(messages)
+
+    # Jobs still queued after fail-fast stopped at the first message
+    # would otherwise hold up the next request.
+    if command.fail_fast and count:
+        workers.restart()
+
+    return {
+        "output": "",
+        "errors": "".join(errors),
+        "status": 1 if count else 0
+    }
+
+
+class _DaemonWorkers(object):
+    """The pool of workers kept by the daemon between requests.
+
+    The pool is None if multiprocessing is disabled, in which case
+    linters run in the daemon itself.
+    """
+
+    def __init__(self):
+        """Start jobs workers, unless multiprocessing is disabled."""
+        super(_DaemonWorkers, self).__init__()
+        if os.getenv("DISABLE_MULTIPROCESSING", None):
+            self.pool = None
+            self.jobs = 1
+        else:
+            self.jobs = multiprocessing.cpu_count()
+            self.pool = _create_pool(self.jobs)
+
+    def restart(self):
+        """Stop all jobs in the pool and start new workers."""
+        if self.pool:
+            self.close()
+            self.pool = _create_pool(self.jobs)
+
+    def close(self):
+        """Stop all jobs in the pool and wait for its workers to exit."""
+        if self.pool:
+            self.pool.terminate()
+            self.pool.join()
+
+
+def _serve_daemon(command):
+    """Serve lint requests, keeping linters and workers warm."""
+    from polysquare_setuptools_lint import daemon
+
+    if not daemon.available():
+        raise DistutilsPlatformError("""--daemon requires unix """
+                                     """domain sockets""")
+
+    # Linters are imported up front, even without workers, so that
+    # requests never pay for importing them.
+    _preload_linters()
+
+    workers = _DaemonWorkers()
+    socket_path = _daemon_socket_path(command.cache_directory)
+    _ensure_directory(os.path.dirname(socket_path))
+    try:
+        daemon.serve(socket_path,
+                     lambda r, w: _handle_daemon_request(command,
+                                                         r,
+                                                         w,
+                                                         workers))
+    finally:
+        workers.close()
+
+
+def _request_daemon(command, files, md_files, project_files, write):
+    """Send a lint request to the daemon, if one is running.
+
+    Output from the daemon is passed to write as it arrives. Returns
+    the daemon's response or None if no daemon is running.
+    """
+    from polysquare_setuptools_lint import daemon
+
+    return daemon.request(_daemon_socket_path(command.cache_directory), {
+        "command": "lint",
+        "cwd": os.getcwd(),
+        "files": files,
+        "md_files": md_files,
+        "project_files": project_files,
+        "options": dict([(o, getattr(command, o)) for o in _DAEMON_OPTIONS])
+    }, write)
+
+
+def run(command):
+    """Run linters."""
+    if command.daemon:
+        _serve_daemon(command)
+        return
+
+    cwd = os.getcwd()
+    files, md_files = _get_files_to_lint(command,
+                                         [os.path.join(cwd, "test")])
+
+    if not files:
+        sys_exit(0)
+        return
+
+    project_files = files
+    if command.changed_since or command.staged:
+        changed = _git_changed_files(command.changed_since, command.staged)
+        files = [f for f in files if f in changed]
+        md_files = [f for f in md_files if os.path.realpath(f) in changed]
+
+        if not files and not md_files:
+            sys_exit(0)
+            return
+
+        # pyroma looks at the whole project, so only run it if
+        # one of its inputs changed.
+        if not any([os.path.realpath(f) in changed
+                    for f in _PYROMA_INPUTS]):
+            command.disable_linters = command.disable_linters + ["pyroma"]
+
+    with _output_stream(command) as stream:
+        _lint_to(command, files, md_files, project_files, stream)
+
+
+@contextmanager
+def _output_stream(command):
+    """Open the output file, or use stdout if there isn't one."""
+    if command.output_file:
+        with open(command.output_file, "w") as output_file:
+            yield output_file
+    else:
+        yield sys.stdout
+
+
+def _lint_to(command, files, md_files, project_files, stream):
+    """Lint files and md_files, writing messages to stream.
+
+    project_files are all of the Python files in the project.
+    """
+    from polysquare_setuptools_lint import output
+
+    def _write(text):
+        """Write text to stream straight away."""
+        stream.write(text)
+        stream.flush()
+
+    if command.use_daemon:
+        response = _request_daemon(command,
+                                   files,
+                                   md_files,
+                                   project_files,
+                                   _write)
+        if response is not None:
+            sys.stderr.write(response.get("errors", ""))
+            stream.write(response["output"])
+            if response["status"]:
+                sys_exit(response["status"])
+
+            return
+
+    use_multiprocessing = (not os.getenv("DISABLE_MULTIPROCESSING",
+                                         None) and
+                           multiprocessing.cpu_count() < len(files) and
+                           multiprocessing.cpu_count() > 2)
+
+    if use_multiprocessing:
+        jobs = multiprocessing.cpu_count()
+        pool = _create_pool(jobs)
+    else:
+        jobs = 1
+        pool = None
+
+    writer = output.create(command.format, _write, command.summary)
+    writer.start()
+
+    try:
+        count, messages = _lint(command,
+                                files,
+                                md_files,
+                                project_files,
+                                pool,
+                                jobs,
+                                writer)
+    except Exception:
+        if pool:
+            pool.terminate()
+
+        raise
+    finally:
+        if pool:
+            # Jobs still running after fail-fast stopped at the
+            # first message are of no use, so don't wait for them.
+            if command.fail_fast:
+                pool.terminate()
+            else:
+                pool.close()
+
+            pool.join()
+
+    writer.finish(messages)
+
+    if count:
+        sys_exit(1)
+
+
+def finalize_options(command):
+    """Finalize all options."""
+    for option in ["suppress-codes", "exclusions", "disable-linters"]:
+        attribute = option.replace("-", "_")
+        if isinstance(getattr(command, attribute), str):
+            setattr(command,
+                    attribute,
+                    getattr(command, attribute).split(","))
+
+        if not isinstance(getattr(command, attribute), list):
+            raise DistutilsArgError("""--{0} must be """
+                                    """a list""".format(option))
+
+    if not isinstance(command.cache_directory, str):
+        raise DistutilsArgError("""--cache-directory=CACHE """
+                                """must be a string""")
+
+    if not isinstance(command.stamp_directory, str):
+        raise DistutilsArgError("""--stamp-directory=STAMP """
+                                """must be a string""")
+
+    if not isinstance(command.stamp_directory, str):
+        raise DistutilsArgError("""--stamp-directory=STAMP """
+                                """must be a string""")
+
+    if not isinstance(command.show_lint_files, int):
+        raise DistutilsArgError("""--show-lint-files must be a int""")
+
+    if not isinstance(command.daemon, int):
+        raise DistutilsArgError("""--daemon must be a int""")
+
+    if not isinstance(command.use_daemon, int):
+        raise DistutilsArgError("""--use-daemon must be a int""")
+
+    if not isinstance(command.changed_since, str):
+        raise DistutilsArgError("""--changed-since=REF """
+                                """must be a string""")
+
+    if not isinstance(command.staged, int):
+        raise DistutilsArgError("""--staged must be a int""")
+
+    if not isinstance(command.use_gitignore, int):
+        raise DistutilsArgError("""--use-gitignore must be a int""")
+
+    if not isinstance(command.summary, int):
+        raise DistutilsArgError("""--summary must be a int""")
+
+    if not isinstance(command.fail_fast, int):
+        raise DistutilsArgError("""--fail-fast must be a int""")
+
+    from polysquare_setuptools_lint import output
+
+    if command.format not in output.FORMATS:
+        raise DistutilsArgError("""--format=FORMAT must be """
+                                """one of {0}""".format(
+                                    ", ".join(output.FORMATS)))
+
+    if not isinstance(command.output_file, str):
+        raise DistutilsArgError("""--output-file=PATH """
+                                """must be a string""")
+
+    if not isinstance(command.profile_linters, str):
+        raise DistutilsArgError("""--profile-linters=PATH """
+                                """must be a string""")
+
+    command.cache_directory = _get_cache_dir(command.cache_directory)
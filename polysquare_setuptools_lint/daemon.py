@@ -0,0 +1,155 @@
+# /polysquare_setuptools_lint/daemon.py
+#
+# A local server which keeps linters imported and workers alive between
+# runs of the lint command, along with a client to talk to it.
+#
+# See /LICENCE.md for Copyright information
+"""A local server which keeps linters warm between runs."""
+
+import errno
+
+import functools
+
+import json
+
+import os
+
+import socket
+
+import traceback
+
+
+def available():
+    """Return true if this platform supports unix domain sockets."""
+    return getattr(socket, "AF_UNIX", None) is not None
+
+
+def _receive(connection):
+    """Receive a JSON payload from connection, until the peer shuts down."""
+    chunks = []
+    while True:
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+
+        chunks.append(chunk)
+
+    return json.loads(b"".join(chunks).decode("utf-8"))
+
+
+def _receive_lines(connection):
+    """Yield each JSON payload sent on its own line over connection."""
+    pending = b""
+    while True:
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield json.loads(line.decode("utf-8"))
+
+
+def _send_line(connection, payload):
+    """Send a JSON payload on its own line over connection."""
+    connection.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+
+
+def _send_output(connection, output):
+    """Send output to the client on connection, before its response."""
+    _send_line(connection, {"output": output})
+
+
+def _send(connection, payload):
+    """Send a JSON payload over connection and shut down writing."""
+    connection.sendall(json.dumps(payload).encode("utf-8"))
+    connection.shutdown(socket.SHUT_WR)
+
+
+def request(socket_path, payload, write=None):
+    """Send payload to the daemon at socket_path and return its response.
+
+    Output sent by the daemon before its response is passed to write as
+    soon as it arrives. Without write, it is put before the output in
+    the response. Returns None if there is no daemon listening at
+    socket_path, or if it stopped before responding.
+    """
+    if not available():
+        return None
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            client.connect(socket_path)
+        except socket.error as error:
+            if error.errno in (errno.ENOENT, errno.ECONNREFUSED):
+                return None
+
+            raise error
+
+        _send(client, payload)
+        written = []
+        for response in _receive_lines(client):
+            if "status" in response:
+                if write is None:
+                    response["output"] = ("".join(written) +
+                                          response["output"])
+
+                return response
+
+            (write or written.append)(response["output"])
+
+        return None
+    finally:
+        client.close()
+
+
+def _remove_socket(socket_path):
+    """Remove a socket file at socket_path if it exists."""
+    try:
+        os.remove(socket_path)
+    except OSError as error:
+        if error.errno != errno.ENOENT:
+            raise error
+
+
+def serve(socket_path, handler):
+    """Serve requests on socket_path until told to stop or interrupted.
+
+    Each request is a JSON object. Requests with a "command" of "stop"
+    shut down the server, all others are passed to handler along with a
+    function which sends output to the client straight away. The return
+    value of handler is sent back as the response once it finishes.
+    """
+    _remove_socket(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(socket_path)
+        os.chmod(socket_path, 0o600)
+        server.listen(5)
+
+        while True:
+            connection = server.accept()[0]
+            try:
+                payload = _receive(connection)
+                if payload.get("command") == "stop":
+                    _send_line(connection, {"output": "", "status": 0})
+                    break
+
+                try:
+                    response = handler(payload,
+                                       functools.partial(_send_output,
+                                                         connection))
+                except Exception:  # suppress(broad-except,B901)
+                    response = {"output": traceback.format_exc(),
+                                "status": 1}
+
+                _send_line(connection, response)
+            finally:
+                connection.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        _remove_socket(socket_path)
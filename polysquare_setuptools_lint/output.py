@@ -0,0 +1,241 @@
+# /polysquare_setuptools_lint/output.py
+#
+# Writers which render linter messages in various formats, a batch
+# at a time, as soon as they are found. Messages have path, line, code,
+# source, character, function and text fields.
+#
+# See /LICENCE.md for Copyright information
+"""Writers which render linter messages as they are found."""
+
+import json
+
+import os
+
+from xml.sax.saxutils import quoteattr
+
+try:
+    from urllib.parse import quote  # suppress(import-error)
+except ImportError:
+    from urllib import quote  # suppress(import-error,no-name-in-module)
+
+
+class _TextWriter(object):
+    """Render messages as pylint does."""
+
+    def __init__(self, write, summary):
+        """Initialize this _TextWriter, writing text with write."""
+        super(_TextWriter, self).__init__()
+        self._write = write
+        self._summary = summary
+        self._written = False
+
+    def start(self):
+        """Write nothing, plain text has no header."""
+
+    def write(self, messages):
+        """Write messages."""
+        self._written = True
+        self._write(render(messages))
+
+    def finish(self, messages):
+        """Write every message again if a summary was requested.
+
+        Output always ends with a blank line, so one is written if
+        there were no messages.
+        """
+        if not self._written:
+            self._write("\n")
+
+        if self._summary and messages:
+            header = """\n{0} messages, by file:\n""".format(len(messages))
+            self._write(header + render(messages))
+
+
+def _fields(message):
+    """Get the fields of message as a dict."""
+    return {
+        "path": message.path,
+        "line": message.line,
+        "character": message.character,
+        "function": message.function,
+        "code": message.code,
+        "source": message.source,
+        "message": message.text
+    }
+
+
+class _JSONLinesWriter(object):
+    """Render each message as a JSON object on its own line."""
+
+    def __init__(self, write, _):
+        """Initialize this _JSONLinesWriter, writing text with write."""
+        super(_JSONLinesWriter, self).__init__()
+        self._write = write
+
+    def start(self):
+        """Write nothing, there is no header."""
+
+    def write(self, messages):
+        """Write messages, one per line."""
+        self._write("".join([json.dumps(_fields(m), sort_keys=True) + "\n"
+                             for m in messages]))
+
+    def finish(self, _):
+        """Write nothing, there is no footer."""
+
+
+def _uri(path):
+    """Get a URI reference for path, with forward slashes.
+
+    Relative paths stay relative. Absolute paths become file URIs.
+    """
+    uri = quote(path.replace(os.sep, "/"), safe="/:")
+    if not os.path.isabs(path):
+        return uri
+
+    return "file://" + ("" if uri.startswith("/") else "/") + uri
+
+
+class _SarifWriter(object):
+    """Render messages as a SARIF 2.1.0 log with a single run.
+
+    Results are written as they are found, so the log is only complete
+    once finish has been called.
+    """
+
+    def __init__(self, write, _):
+        """Initialize this _SarifWriter, writing text with write."""
+        super(_SarifWriter, self).__init__()
+        self._write = write
+        self._separator = "\n"
+
+        log = json.dumps({
+            "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+            "version": "2.1.0",
+            "runs": [{
+                "tool": {"driver": {"name": "polysquare-setuptools-lint"}},
+                "results": []
+            }]
+        }, sort_keys=True)
+        # The empty list of results is the only empty list in the log.
+        split = log.index("[]") + 1
+        self._header = log[:split]
+        self._footer = log[split:]
+
+    def start(self):
+        """Write everything in the log up to the list of results."""
+        self._write(self._header)
+
+    def write(self, messages):
+        """Write a result for each of messages."""
+        results = []
+        for message in messages:
+            region = {"startLine": max(message.line or 1, 1)}
+            if isinstance(message.character, int):
+                region["startColumn"] = message.character + 1
+
+            results.append(self._separator + json.dumps({
+                "ruleId": message.code,
+                "level": "warning",
+                "message": {"text": message.text},
+                "locations": [{
+                    "physicalLocation": {
+                        "artifactLocation": {"uri": _uri(message.path)},
+                        "region": region
+                    }
+                }],
+                "properties": {"source": message.source}
+            }, sort_keys=True))
+            self._separator = ",\n"
+
+        self._write("".join(results))
+
+    def finish(self, _):
+        """Close the list of results and the log."""
+        self._write("\n" + self._footer + "\n")
+
+
+class _CheckstyleWriter(object):
+    """Render messages as checkstyle XML.
+
+    Each batch of messages gets its own file elements, so a file may
+    appear more than once.
+    """
+
+    def __init__(self, write, _):
+        """Initialize this _CheckstyleWriter, writing text with write."""
+        super(_CheckstyleWriter, self).__init__()
+        self._write = write
+
+    def start(self):
+        """Write the XML declaration and open the root element."""
+        self._write("""<?xml version="1.0" encoding="UTF-8"?>\n"""
+                    """<checkstyle version="4.3">\n""")
+
+    def write(self, messages):
+        """Write an error element for each of messages, by file."""
+        by_file = dict()
+        for message in messages:
+            by_file.setdefault(message.path, []).append(message)
+
+        elements = []
+        for path in sorted(by_file.keys()):
+            elements.append("""<file name={0}>\n""".format(quoteattr(path)))
+            for message in by_file[path]:
+                elements.append("""<error line="{0}" column="{1}" """
+                                """severity="warning" message={2} """
+                                """source={3}/>\n""".format(
+                                    message.line or 0,
+                                    message.character or 0,
+                                    quoteattr(message.text),
+                                    quoteattr("{0}.{1}".format(
+                                        message.source,
+                                        message.code))))
+            elements.append("""</file>\n""")
+
+        self._write("".join(elements))
+
+    def finish(self, _):
+        """Close the root element."""
+        self._write("""</checkstyle>\n""")
+
+
+_WRITERS = {
+    "text": _TextWriter,
+    "jsonl": _JSONLinesWriter,
+    "sarif": _SarifWriter,
+    "checkstyle": _CheckstyleWriter
+}
+
+FORMATS = sorted(_WRITERS.keys())
+
+
+def render(messages):
+    """Render messages as pylint does, ending with a newline."""
+    from prospector.formatters.pylint import PylintFormatter
+    from prospector.message import Message, Location
+
+    messages = [Message(m.source,
+                        m.code,
+                        Location(m.path,
+                                 None,
+                                 m.function,
+                                 m.line,
+                                 m.character,
+                                 absolute_path=False),
+                        m.text)
+                for m in messages]
+    return PylintFormatter(dict(),
+                           messages,
+                           None).render(messages=True,
+                                        summary=False,
+                                        profile=False) + "\n"
+
+
+def create(output_format, write, summary):
+    """Create a writer for output_format, which writes text with write.
+
+    If summary is true, writers which support it write every message
+    again when they finish.
+    """
+    return _WRITERS[output_format](write, summary)
@@ -0,0 +1,151 @@
+# /polysquare_setuptools_lint/parsed_files.py
+#
+# A store of files which have been read and parsed by this process, so
+# that each linter which can accept them doesn't read and parse the
+# same file again.
+#
+# See /LICENCE.md for Copyright information
+"""A store of files read and parsed once by this process."""
+
+import ast
+
+import functools
+
+import io
+
+import os
+
+import sys
+
+import tokenize
+
+from collections import OrderedDict
+
+
+# Files are evicted, least recently used first, past this many.
+_MAX_FILES = 256
+
+_UNSET = object()
+
+
+def _split_lines(text):
+    """Split text into lines ending in newlines, as readlines does."""
+    lines = text.split("\n")
+    return ([line + "\n" for line in lines[:-1]] +
+            [line for line in lines[-1:] if line])
+
+
+class ParsedFile(object):
+    """The contents of a file, read once.
+
+    Lines, tokens and the syntax tree are worked out the first time
+    they are needed. Each is None if the file could not be read or
+    parsed that way, in which case callers should fall back to
+    reading the file themselves.
+    """
+
+    def __init__(self, filename):
+        """Read filename."""
+        super(ParsedFile, self).__init__()
+        self.filename = filename
+        self._lines = _UNSET
+        self._tokens = _UNSET
+        self._tree = _UNSET
+
+        try:
+            with open(filename, "rb") as source_file:
+                self.source = source_file.read()
+        except (IOError, OSError):
+            self.source = None
+
+    @property
+    def lines(self):
+        """Get the decoded lines of the file, with universal newlines.
+
+        These are the same lines that pep8 reads for itself.
+        """
+        if self._lines is _UNSET:
+            self._lines = None
+            if self.source is None:
+                return None
+
+            try:
+                if sys.version_info.major >= 3:
+                    readline = io.BytesIO(self.source).readline
+                    encoding = tokenize.detect_encoding(readline)[0]
+                    text = io.TextIOWrapper(io.BytesIO(self.source),
+                                            encoding).read()
+                else:
+                    text = self.source.replace(b"\r\n",
+                                               b"\n").replace(b"\r", b"\n")
+            except (LookupError, SyntaxError, UnicodeDecodeError):
+                return None
+
+            self._lines = _split_lines(text)
+
+        return self._lines
+
+    @property
+    def tokens(self):
+        """Get the tokens in the file as a list."""
+        if self._tokens is _UNSET:
+            self._tokens = None
+            if self.lines is None:
+                return None
+
+            readline = functools.partial(next, iter(self.lines), "")
+            try:
+                self._tokens = list(tokenize.generate_tokens(readline))
+            except (tokenize.TokenError, IndentationError, SyntaxError):
+                return None
+
+        return self._tokens
+
+    @property
+    def tree(self):
+        """Get the syntax tree of the file."""
+        if self._tree is _UNSET:
+            self._tree = None
+            if self.source is None:
+                return None
+
+            try:
+                self._tree = ast.parse(self.source, self.filename)
+            except (SyntaxError, TypeError, ValueError):
+                return None
+
+        return self._tree
+
+
+_FILES = OrderedDict()
+_GENERATION = [None]
+
+
+def reset(generation):
+    """Forget every file if generation is not the current generation.
+
+    Each lint run has its own generation, so files are read again by
+    the next run, even in processes which outlive a single run. Returns
+    true if generation is a new generation.
+    """
+    if _GENERATION[0] == generation:
+        return False
+
+    _FILES.clear()
+    _GENERATION[0] = generation
+    return True
+
+
+def get(filename):
+    """Get the ParsedFile for filename, reading it if necessary."""
+    filename = os.path.abspath(filename)
+    try:
+        parsed = _FILES.pop(filename)
+    except KeyError:
+        parsed = ParsedFile(filename)
+
+    _FILES[filename] = parsed
+    while len(_FILES) > _MAX_FILES:
+        _FILES.popitem(last=False)
+
+    return parsed
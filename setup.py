@@ -52,8 +52,6 @@ setup(name="polysquare-setuptools-lint",
       cmdclass=_CMDCLASS,
       install_requires=[
           "setuptools",
-          "jobstamps>=0.0.16",
-          "parmap",
           "pep8",
           "dodgy",
           "mccabe",
@@ -10,10 +10,22 @@ import doctest
 
 import errno
 
+import json
+
 import os
 
 import shutil
 
+import subprocess
+
+import sys
+
+import threading
+
+import time
+
+from collections import OrderedDict
+
 from tempfile import mkdtemp
 
 from distutils.errors import DistutilsArgError  # suppress(I100,import-error)
@@ -24,14 +36,16 @@ from mock import Mock
 
 from nose_parameterized import param, parameterized
 
-import polysquare_setuptools_lint
+import polysquare_setuptools_lint.command
 from polysquare_setuptools_lint import (PolysquareLintCommand,
-                                        can_run_pylint)
+                                        can_run_pylint,
+                                        daemon,
+                                        parsed_files)
 
 from setuptools import Distribution
 from setuptools import find_packages as fp
 
-from testtools import ExpectedException, TestCase
+from testtools import ExpectedException, TestCase, skipUnless
 from testtools.matchers import (DocTestMatches, MatchesAll, Not)
 
 
@@ -49,6 +63,22 @@ def _open_file_force_create(path, mode="w"):
     return open(path, mode)
 
 
+def _git(*args):
+    """Run git with args in the current directory, discarding output."""
+    with open(os.devnull, "w") as devnull:
+        subprocess.check_call(["git"] + list(args),
+                              stdout=devnull,
+                              stderr=devnull)
+
+
+def _pep257_info_discarded():
+    """Return true if pep257's info logging is discarded in this process."""
+    import pep257
+
+    # suppress(protected-access)
+    return pep257.log.info is polysquare_setuptools_lint.command._discard_log
+
+
 def disable_mod(*disable_list):
     """Disable the specified linters for this test run."""
     def _modifier(command):
@@ -83,7 +113,7 @@ class TestPolysquareLintCommand(TestCase):
             shutil.rmtree(project_directory)
 
         self.addCleanup(cleanup_func)
-        self.patch(polysquare_setuptools_lint, "sys_exit", Mock())
+        self.patch(polysquare_setuptools_lint.command, "sys_exit", Mock())
 
         with self._open_test_file():
             pass
@@ -234,6 +264,90 @@ class TestPolysquareLintCommand(TestCase):
                         Not(DocTestMatches("...{0}...".format(bug_type),
                             doctest.ELLIPSIS)))
 
+    @parameterized.expand(PYFLAKES_BUGS)
+    def test_find_pyflakes_bugs_with_flake8_disabled(self, bug_type, script):
+        """Prospector still runs pyflakes when flake8 is disabled."""
+        with self._open_module_file() as f:
+            f.write(script)
+
+        # pylint reports undefined names in place of pyflakes.
+        self.assertThat(self._get_command_output(disable_mod("flake8",
+                                                             "pylint")),
+                        DocTestMatches("...{0}...".format(bug_type),
+                                       doctest.ELLIPSIS))
+
+    def test_find_pep8_bugs_ignored_by_flake8(self):
+        """Prospector reports pep8 checks which flake8 ignores by default."""
+        with self._open_module_file() as f:
+            f.write("def my_method(): pass\n")
+
+        self.assertThat(self._get_command_output(),
+                        DocTestMatches("...E704...", doctest.ELLIPSIS))
+
+    def test_pyflakes_checks_each_file_once(self):
+        """pyflakes checks each file once for prospector and flake8."""
+        os.environ["DISABLE_MULTIPROCESSING"] = "1"
+        self.addCleanup(os.environ.pop, "DISABLE_MULTIPROCESSING")
+        from pyflakes.checker import Checker
+
+        checked = list()
+        checker_init = Checker.__init__
+
+        def record_checked(checker, tree, filename, *args, **kwargs):
+            """Record that filename was checked."""
+            checked.append(os.path.realpath(filename))
+            checker_init(checker, tree, filename, *args, **kwargs)
+
+        self.patch(Checker, "__init__", record_checked)
+        with self._open_module_file() as f:
+            f.write("import sys\n")
+
+        self.assertThat(self._get_command_output(),
+                        DocTestMatches("...F401(F401)...", doctest.ELLIPSIS))
+        self.assertIn(os.path.realpath(f.name), checked)
+        self.assertEqual(sorted(set(checked)), sorted(checked))
+
+    def test_flake8_leaves_out_pep8_checks_prospector_runs(self):
+        """flake8 reports the pep8 checks prospector runs for it."""
+        os.environ["DISABLE_MULTIPROCESSING"] = "1"
+        self.addCleanup(os.environ.pop, "DISABLE_MULTIPROCESSING")
+        from pep8 import Checker
+
+        logical_checks = list()
+        check_all = Checker.check_all
+
+        def record_checks(checker, *args, **kwargs):
+            """Record the logical checks flake8 runs."""
+            # suppress(protected-access)
+            logical_checks.extend([c[0] for c in checker._logical_checks])
+            return check_all(checker, *args, **kwargs)
+
+        self.patch(Checker, "check_all", record_checks)
+        with self._open_module_file() as f:
+            f.write("value=1\n")
+
+        with open(".prospector.yaml", "w") as config_file:
+            config_file.write("pep8:\n"
+                              "  disable:\n"
+                              "    - E225\n")
+
+        self.assertThat(self._get_command_output(),
+                        DocTestMatches("...E225(E225)...", doctest.ELLIPSIS))
+        self.assertNotIn("missing_whitespace_around_operator", logical_checks)
+
+    def test_flake8_runs_checks_prospector_configures_differently(self):
+        """flake8 runs its own line length check if prospector's differs."""
+        with self._open_module_file() as f:
+            f.write("VALUE = \"{0}\"\n".format("a" * 80))
+
+        with open(".prospector.yaml", "w") as config_file:
+            config_file.write("pep8:\n"
+                              "  options:\n"
+                              "    max-line-length: 100\n")
+
+        self.assertThat(self._get_command_output(),
+                        DocTestMatches("...E501(E501)...", doctest.ELLIPSIS))
+
     @parameterized.expand(PYLINT_BUGS)
     def test_disable_pylint(self, bug_type, script):
         """Don't find pylint bugs when pylint is disabled."""
@@ -284,6 +398,30 @@ class TestPolysquareLintCommand(TestCase):
                         Not(DocTestMatches("...{0}...".format(bug_type),
                                            doctest.ELLIPSIS)))
 
+    def test_pyroma_cache_invalidated_by_readme(self):
+        """Cached pyroma results are invalidated when README.md changes."""
+        self._enable_result_cache()
+
+        with self._open_setup_file() as setup_file:
+            setup_file.write("from setuptools import setup\n"
+                             "with open(\"README.md\") as readme:\n"
+                             "    setup(name=\"foo\",\n"
+                             "          long_description=readme.read())\n")
+
+        with open("README.md", "w") as readme_file:
+            readme_file.write("Short\n")
+
+        self.assertThat(self._get_command_output(),
+                        DocTestMatches("...LongDescription...",
+                                       doctest.ELLIPSIS))
+
+        with open("README.md", "w") as readme_file:
+            readme_file.write("A much longer description. " * 20 + "\n")
+
+        self.assertThat(self._get_command_output(),
+                        Not(DocTestMatches("...LongDescription...",
+                                           doctest.ELLIPSIS)))
+
     def test_suppress_pyroma_warnings(self):
         """Suppress pyroma warnings by command line option."""
         script = "from setuptools import setup\nsetup(name=\"foo\")"
@@ -345,3 +483,1019 @@ class TestPolysquareLintCommand(TestCase):
         """Passing a non-list or non string as an option raises an error."""
         with ExpectedException(DistutilsArgError):
             self._get_command_output(lambda c: setattr(c, attrib, True))
+
+    def _enable_result_cache(self):
+        """Enable the result cache for this test only."""
+        del os.environ["JOBSTAMPS_DISABLED"]
+        self.addCleanup(os.environ.__setitem__, "JOBSTAMPS_DISABLED", "1")
+
+    def test_cached_results_reported_again(self):
+        """Messages are reported again when results come from the cache."""
+        self._enable_result_cache()
+
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        self._get_command_output()
+        self.assertThat(self._get_command_output(),
+                        DocTestMatches("...F401...", doctest.ELLIPSIS))
+
+    def test_batch_messages_same_when_cached(self):
+        """A batch reports the same messages from the cache as uncached."""
+        self._enable_result_cache()
+
+        # suppress(protected-access)
+        command = polysquare_setuptools_lint.command
+        module_path = os.path.realpath(os.path.join(os.getcwd(),
+                                                    self._package_name,
+                                                    "module.py"))
+        other_path = os.path.realpath(os.path.join(os.getcwd(),
+                                                   self._package_name,
+                                                   "other.py"))
+
+        def lint(filenames):
+            """Report messages about filenames and another file."""
+            outside = command._message("linter", "outside", other_path, 1, "B")
+            return [command._message("linter", "in-batch", f, 1, "A")
+                    for f in filenames] + [outside]
+
+        cache = command._result_cache(os.path.join(os.getcwd(), "cache"))
+        uncached = command._cached_batch(cache, lint, [module_path])
+        self.assertEqual(["in-batch"], [m.code for m in uncached])
+        self.assertEqual(uncached,
+                         command._cached_batch(cache, lint, [module_path]))
+
+    def test_summary_repeats_messages_at_end(self):
+        """Messages are printed again after a count with summary."""
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        def options_modifier(command):
+            """Print a summary."""
+            command.summary = 1
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        DocTestMatches("...F401...messages, by file:"
+                                       "...F401...",
+                                       doctest.ELLIPSIS))
+
+    def test_messages_without_line_sorted_with_others(self):
+        """Messages about a whole file sort along with other messages."""
+        os.environ["DISABLE_MULTIPROCESSING"] = "1"
+        self.addCleanup(os.environ.pop, "DISABLE_MULTIPROCESSING")
+
+        # Suppressions are only looked up in files which aren't empty.
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        module_path = os.path.realpath(os.path.join(os.getcwd(),
+                                                    self._package_name,
+                                                    "module.py"))
+
+        def run_dodgy(*_):
+            """Report one message about the whole file and one line."""
+            # suppress(protected-access)
+            message = polysquare_setuptools_lint.command._message
+            return [message("dodgy", "whole-file", module_path, None, "A"),
+                    message("dodgy", "one-line", module_path, 1, "B")]
+
+        self.patch(polysquare_setuptools_lint.command,
+                   "_run_dodgy",
+                   run_dodgy)
+        self.assertThat(self._get_command_output(),
+                        DocTestMatches("...whole-file...one-line...",
+                                       doctest.ELLIPSIS))
+
+    def test_duplicate_messages_from_earliest_linter_kept(self):
+        """Messages with the same key are taken from the earliest linter."""
+        os.environ["DISABLE_MULTIPROCESSING"] = "1"
+        self.addCleanup(os.environ.pop, "DISABLE_MULTIPROCESSING")
+        module_path = os.path.realpath(os.path.join(os.getcwd(),
+                                                    self._package_name,
+                                                    "module.py"))
+
+        def linter(text):
+            """Get a linter reporting the same message with text."""
+            def run_linter(*_):
+                """Report the message."""
+                # suppress(protected-access)
+                message = polysquare_setuptools_lint.command._message
+                return [message("linter", "duplicate", module_path, 1, text)]
+
+            return run_linter
+
+        # dodgy comes before flake8 in the order of linters.
+        self.patch(polysquare_setuptools_lint.command,
+                   "_run_dodgy",
+                   linter("from dodgy"))
+        self.patch(polysquare_setuptools_lint.command,
+                   "_run_flake8",
+                   linter("from flake8"))
+        self.assertThat(self._get_command_output(),
+                        MatchesAll(DocTestMatches("...from dodgy...",
+                                                  doctest.ELLIPSIS),
+                                   Not(DocTestMatches("...from flake8...",
+                                                      doctest.ELLIPSIS))))
+
+    def test_text_format_writes_blank_line_without_messages(self):
+        """Text output is a blank line if there are no messages."""
+        from polysquare_setuptools_lint import output
+
+        written = []
+        writer = output.create("text", written.append, False)
+        writer.start()
+        writer.finish([])
+        self.assertEqual("\n", "".join(written))
+
+    def test_jsonl_format_writes_one_message_per_line(self):
+        """Each message is a JSON object on its own line with jsonl."""
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        def options_modifier(command):
+            """Write JSON lines."""
+            command.format = "jsonl"
+
+        output = self._get_command_output(options_modifier)
+        codes = [json.loads(line)["code"] for line in output.splitlines()]
+        self.assertIn("F401", codes)
+
+        # Messages are only counted, not kept, but still fail the run.
+        polysquare_setuptools_lint.command.sys_exit.assert_called_with(1)
+
+    def test_sarif_format_written_to_output_file(self):
+        """A complete SARIF log is written to output_file."""
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        output_file = os.path.join(os.getcwd(), "lint.sarif")
+
+        def options_modifier(command):
+            """Write SARIF to output_file."""
+            command.format = "sarif"
+            command.output_file = output_file
+
+        self._get_command_output(options_modifier)
+
+        with open(output_file) as sarif_file:
+            results = json.load(sarif_file)["runs"][0]["results"]
+
+        self.assertIn("F401", [r["ruleId"] for r in results])
+        uris = [r["locations"][0]["physicalLocation"]["artifactLocation"]
+                for r in results]
+        self.assertIn({"uri": "{0}/module.py".format(self._package_name)},
+                      uris)
+
+    def test_sarif_locations_are_uris(self):
+        """SARIF artifact locations are URIs with forward slashes."""
+        # suppress(protected-access)
+        from polysquare_setuptools_lint import output
+
+        relative = os.path.join("package", "my module.py")
+        self.assertEqual("package/my%20module.py", output._uri(relative))
+        self.assertThat(output._uri(os.path.abspath(relative)),
+                        DocTestMatches("file:///.../package/my%20module.py",
+                                       doctest.ELLIPSIS))
+
+    def test_unknown_format_raises(self):
+        """Passing an unknown output format raises an error."""
+        with ExpectedException(DistutilsArgError):
+            self._get_command_output(lambda c: setattr(c, "format", "xml"))
+
+    def test_inline_suppression_applied_to_cached_results(self):
+        """Inline suppressions still apply when results come from cache."""
+        self._enable_result_cache()
+
+        with self._open_module_file() as module_file:
+            module_file.write("# suppress(F401,unused-import)\n"
+                              "import sys\nimport os\n")
+
+        self._get_command_output()
+        self.assertThat(self._get_command_output(),
+                        MatchesAll(DocTestMatches("...module.py:3...",
+                                                  doctest.ELLIPSIS),
+                                   Not(DocTestMatches("...module.py:2...",
+                                                      doctest.ELLIPSIS))))
+
+    def test_cache_invalidated_by_content_not_mtime(self):
+        """Cached results are invalidated by content, even if mtime is same."""
+        self._enable_result_cache()
+
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        module_path = module_file.name
+        module_stat = os.stat(module_path)
+        self._get_command_output()
+
+        with self._open_module_file() as module_file:
+            module_file.write("x = 1\n")
+
+        os.utime(module_path, (module_stat.st_atime, module_stat.st_mtime))
+        self.assertThat(self._get_command_output(),
+                        Not(DocTestMatches("...F401...", doctest.ELLIPSIS)))
+
+    @skipUnless(can_run_pylint(), "pylint not available")
+    def test_cache_invalidated_by_linter_configuration(self):
+        """Cached results are invalidated when linter configuration changes."""
+        self._enable_result_cache()
+
+        with self._open_module_file() as module_file:
+            module_file.write("bar\n")
+
+        self.assertThat(self._get_command_output(),
+                        DocTestMatches("...pointless-statement...",
+                                       doctest.ELLIPSIS))
+
+        with open(".prospector.yaml", "w") as config_file:
+            config_file.write("pylint:\n"
+                              "  disable:\n"
+                              "    - pointless-statement\n")
+
+        self.assertThat(self._get_command_output(),
+                        Not(DocTestMatches("...pointless-statement...",
+                                           doctest.ELLIPSIS)))
+
+    def test_cached_results_shared_between_checkouts(self):
+        """Checkouts in different directories share cached results."""
+        self._enable_result_cache()
+        stamp_directory = mkdtemp()
+        self.addCleanup(shutil.rmtree, stamp_directory)
+
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        report_path = os.path.join(stamp_directory, "profile.json")
+
+        def options_modifier(command):
+            """Share the stamp directory and profile linters."""
+            command.stamp_directory = stamp_directory
+            command.profile_linters = report_path
+
+        self._get_command_output(options_modifier)
+
+        checkout = os.getcwd() + "_checkout"
+        shutil.copytree(os.getcwd(), checkout)
+        self.addCleanup(shutil.rmtree, checkout)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(checkout)
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        DocTestMatches("...module.py...F401...",
+                                       doctest.ELLIPSIS))
+
+        with open(report_path) as report_file:
+            report = json.load(report_file)
+
+        self.assertIn(("flake8",
+                       os.path.join(self._package_name, "module.py"),
+                       True),
+                      [(e["linter"], e["file"], e["cached"])
+                       for e in report["entries"]])
+
+    @skipUnless(can_run_pylint(), "pylint not available")
+    def test_find_bugs_in_all_files_of_batch(self):
+        """Find prospector bugs in every file of a batch."""
+        # Without multiprocessing, both modules go into one batch and,
+        # since they are not tests, into one Prospector session. Only
+        # prospector reports undefined-variable, from pylint.
+        os.environ["DISABLE_MULTIPROCESSING"] = "1"
+        self.addCleanup(os.environ.pop, "DISABLE_MULTIPROCESSING")
+
+        with self._open_module_file() as module_file:
+            module_file.write("bar\n")
+
+        with _open_file_force_create(os.path.join(os.getcwd(),
+                                                  self._package_name,
+                                                  "other.py"),
+                                     "w") as other_file:
+            other_file.write("bar\n")
+
+        self.assertThat(self._get_command_output(disable_mod("flake8")),
+                        MatchesAll(DocTestMatches("...module.py...undefined-"
+                                                  "variable(pylint)...",
+                                                  doctest.ELLIPSIS),
+                                   DocTestMatches("...other.py...undefined-"
+                                                  "variable(pylint)...",
+                                                  doctest.ELLIPSIS)))
+
+    def test_use_daemon_lints_locally_without_daemon(self):
+        """Lint in-process if no daemon is running with --use-daemon."""
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        def options_modifier(command):
+            """Set the use-daemon option."""
+            command.use_daemon = 1
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        DocTestMatches("...F401...", doctest.ELLIPSIS))
+
+    @skipUnless(daemon.available(), "Unix domain sockets not available")
+    def test_daemon_responds_to_requests(self):
+        """The daemon responds to requests until told to stop."""
+        socket_directory = mkdtemp()
+        self.addCleanup(shutil.rmtree, socket_directory)
+        socket_path = os.path.join(socket_directory, "daemon.sock")
+
+        def handler(request, write):
+            """Send output from the request before responding."""
+            write(request["output"])
+            return {"output": "", "status": 0}
+
+        server = threading.Thread(target=daemon.serve,
+                                  args=(socket_path, handler))
+        server.start()
+
+        response = None
+        written = []
+        for _ in range(100):
+            response = daemon.request(socket_path,
+                                      {"output": "pong"},
+                                      written.append)
+            if response is not None:
+                break
+
+            time.sleep(0.05)
+
+        daemon.request(socket_path, {"command": "stop"})
+        server.join()
+
+        self.assertEqual((written, response),
+                         (["pong"], {"output": "", "status": 0}))
+
+    def _start_lint_daemon(self):
+        """Start a lint daemon in a thread, stopped when the test ends."""
+        server = PolysquareLintCommand(self._distribution)
+        server.daemon = 1
+        server.ensure_finalized()
+
+        # suppress(protected-access)
+        socket_path = polysquare_setuptools_lint.command._daemon_socket_path(
+            server.cache_directory
+        )
+        thread = threading.Thread(target=server.run)
+        thread.start()
+
+        def stop_daemon():
+            """Stop the daemon and wait for it to finish."""
+            daemon.request(socket_path, {"command": "stop"})
+            thread.join()
+
+        self.addCleanup(stop_daemon)
+
+        # The daemon turns away requests from other directories, so
+        # this tells when it is ready without linting anything.
+        for _ in range(100):
+            if daemon.request(socket_path, {"cwd": ""}) is not None:
+                break
+
+            time.sleep(0.05)
+
+    @skipUnless(daemon.available(), "Unix domain sockets not available")
+    @skipUnless(can_run_pylint(), "pylint not available")
+    def test_daemon_lints_edited_module_again(self):
+        """The daemon checks the new contents of a module after an edit."""
+        self._enable_result_cache()
+        os.environ["DISABLE_MULTIPROCESSING"] = "1"
+        self.addCleanup(os.environ.pop, "DISABLE_MULTIPROCESSING")
+
+        other_path = os.path.join(os.getcwd(), self._package_name, "other.py")
+        with _open_file_force_create(other_path) as other_file:
+            other_file.write("def function():\n    pass\n")
+
+        with self._open_module_file() as module_file:
+            module_file.write("from package.other import function\n"
+                              "function(1)\n")
+
+        self._start_lint_daemon()
+
+        def options_modifier(command):
+            """Set the use-daemon option."""
+            command.use_daemon = 1
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        DocTestMatches("...too-many-function-args...",
+                                       doctest.ELLIPSIS))
+
+        with self._open_module_file() as module_file:
+            module_file.write("from package.other import function\n"
+                              "function()\n")
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        Not(DocTestMatches("...too-many-function-args...",
+                                           doctest.ELLIPSIS)))
+
+    @skipUnless(daemon.available(), "Unix domain sockets not available")
+    def test_daemon_spellchecks_with_edited_dictionary(self):
+        """The daemon reports words removed from /DICTIONARY."""
+        self._enable_result_cache()
+        os.environ["DISABLE_MULTIPROCESSING"] = "1"
+        self.addCleanup(os.environ.pop, "DISABLE_MULTIPROCESSING")
+
+        with open("README.md", "w") as readme_file:
+            readme_file.write("Some text about frobnicated things.\n")
+
+        with open("DICTIONARY", "w") as dictionary_file:
+            dictionary_file.write("frobnicated\n")
+
+        self._start_lint_daemon()
+
+        def options_modifier(command):
+            """Set the use-daemon option."""
+            command.use_daemon = 1
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        Not(DocTestMatches("...frobnicated...",
+                                           doctest.ELLIPSIS)))
+
+        with open("DICTIONARY", "w") as dictionary_file:
+            dictionary_file.write("other\n")
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        DocTestMatches("...README.md...frobnicated...",
+                                       doctest.ELLIPSIS))
+
+    @skipUnless(daemon.available(), "Unix domain sockets not available")
+    def test_daemon_profiles_linters(self):
+        """The daemon profiles each linter with --profile-linters."""
+        os.environ["DISABLE_MULTIPROCESSING"] = "1"
+        self.addCleanup(os.environ.pop, "DISABLE_MULTIPROCESSING")
+        report_path = os.path.join(os.getcwd(), "profile.json")
+        self._start_lint_daemon()
+
+        def options_modifier(command):
+            """Use the daemon and profile linters."""
+            command.use_daemon = 1
+            command.profile_linters = report_path
+
+        self._get_command_output(options_modifier)
+
+        with open(report_path) as report_file:
+            report = json.load(report_file)
+
+        self.assertIn(("prospector", os.path.join(self._package_name,
+                                                  "module.py")),
+                      [(e["linter"], e["file"]) for e in report["entries"]])
+
+    @skipUnless(daemon.available(), "Unix domain sockets not available")
+    def test_daemon_restarts_workers_after_fail_fast(self):
+        """The daemon stops outstanding jobs once fail-fast stops early."""
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        # suppress(protected-access)
+        create_pool = polysquare_setuptools_lint.command._create_pool
+        pools = []
+
+        def counted_create_pool(jobs):
+            """Create a pool and count it."""
+            pools.append(create_pool(jobs))
+            return pools[-1]
+
+        self.patch(polysquare_setuptools_lint.command,
+                   "_create_pool",
+                   counted_create_pool)
+        self._start_lint_daemon()
+        started = len(pools)
+
+        def fail_fast_modifier(command):
+            """Use the daemon and stop at the first message."""
+            command.use_daemon = 1
+            command.fail_fast = 1
+
+        self.assertThat(self._get_command_output(fail_fast_modifier),
+                        DocTestMatches("...module.py...", doctest.ELLIPSIS))
+        polysquare_setuptools_lint.command.sys_exit.assert_called_with(1)
+        self.assertEqual(len(pools), started * 2)
+
+        def options_modifier(command):
+            """Use the daemon."""
+            command.use_daemon = 1
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        DocTestMatches("...F401...", doctest.ELLIPSIS))
+
+    def test_lint_only_files_changed_since_ref(self):
+        """Only lint files changed since a git ref with --changed-since."""
+        with self._open_test_file() as test_file:
+            test_file.write("bar\n")
+
+        _git("init")
+        _git("add", ".")
+        _git("-c", "user.name=Test",
+             "-c", "user.email=test@example.com",
+             "commit", "-m", "Initial commit")
+
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        def options_modifier(command):
+            """Set the changed-since option."""
+            command.changed_since = "HEAD"
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        MatchesAll(DocTestMatches("...F401...",
+                                                  doctest.ELLIPSIS),
+                                   Not(DocTestMatches("...F821...",
+                                                      doctest.ELLIPSIS))))
+
+    def test_changed_since_with_only_tests_changed(self):
+        """Only changed tests are linted when no other files changed."""
+        with self._open_module_file() as module_file:
+            module_file.write("FACEBOOK_PASSWORD = '123456'\n")
+
+        _git("init")
+        _git("add", ".")
+        _git("-c", "user.name=Test",
+             "-c", "user.email=test@example.com",
+             "commit", "-m", "Initial commit")
+
+        with self._open_test_file() as test_file:
+            test_file.write("import sys\n")
+
+        def options_modifier(command):
+            """Set the changed-since option."""
+            command.changed_since = "HEAD"
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        MatchesAll(DocTestMatches("...F401...",
+                                                  doctest.ELLIPSIS),
+                                   Not(DocTestMatches("...password...",
+                                                      doctest.ELLIPSIS))))
+
+    @skipUnless(can_run_pylint(), "pylint not available")
+    def test_cache_invalidated_by_change_to_imported_module(self):
+        """Cached results are invalidated when an imported module changes."""
+        self._enable_result_cache()
+
+        # prospector disables no-name-in-module, so use a message which
+        # depends on the signature of a function in the other module.
+        other_path = os.path.join(os.getcwd(), self._package_name, "other.py")
+        with _open_file_force_create(other_path) as other_file:
+            other_file.write("def function():\n    pass\n")
+
+        with self._open_module_file() as module_file:
+            module_file.write("from package.other import function\n"
+                              "function(1)\n")
+
+        self.assertThat(self._get_command_output(),
+                        DocTestMatches("...too-many-function-args...",
+                                       doctest.ELLIPSIS))
+
+        with _open_file_force_create(other_path) as other_file:
+            other_file.write("def function(argument):\n"
+                             "    return argument\n")
+
+        self.assertThat(self._get_command_output(),
+                        Not(DocTestMatches("...too-many-function-args...",
+                                           doctest.ELLIPSIS)))
+
+    def test_changed_since_keeps_imports_of_other_files(self):
+        """Imports of files not linted with --changed-since are kept."""
+        self._enable_result_cache()
+        stamp_directory = os.path.join(os.getcwd(), "stamps")
+
+        _git("init")
+        _git("add", ".")
+        _git("-c", "user.name=Test",
+             "-c", "user.email=test@example.com",
+             "commit", "-m", "Initial commit")
+
+        def options_modifier(command):
+            """Set the stamp-directory option."""
+            command.stamp_directory = stamp_directory
+
+        self._get_command_output(options_modifier)
+
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        def changed_options_modifier(command):
+            """Set the stamp-directory and changed-since options."""
+            options_modifier(command)
+            command.changed_since = "HEAD"
+
+        self._get_command_output(changed_options_modifier)
+
+        with open(os.path.join(stamp_directory, "imports.json")) as imports:
+            self.assertIn(os.path.realpath("setup.py"), json.load(imports))
+
+    @skipUnless(can_run_pylint(), "pylint not available")
+    def test_changed_since_invalidated_by_unchanged_imported_module(self):
+        """Cached results are invalidated by imported modules not linted."""
+        self._enable_result_cache()
+
+        other_path = os.path.join(os.getcwd(), self._package_name, "other.py")
+        with _open_file_force_create(other_path) as other_file:
+            other_file.write("def function():\n    pass\n")
+
+        _git("init")
+        _git("add", ".")
+        _git("-c", "user.name=Test",
+             "-c", "user.email=test@example.com",
+             "commit", "-m", "Initial commit")
+
+        with self._open_module_file() as module_file:
+            module_file.write("from package.other import function\n"
+                              "function(1)\n")
+
+        def options_modifier(command):
+            """Set the changed-since option."""
+            command.changed_since = "HEAD"
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        DocTestMatches("...too-many-function-args...",
+                                       doctest.ELLIPSIS))
+
+        # Only the module is linted again, since the change to the
+        # module it imports is committed.
+        with _open_file_force_create(other_path) as other_file:
+            other_file.write("def function(argument):\n"
+                             "    return argument\n")
+
+        _git("add", other_path)
+        _git("-c", "user.name=Test",
+             "-c", "user.email=test@example.com",
+             "commit", "-m", "Change function")
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        Not(DocTestMatches("...too-many-function-args...",
+                                           doctest.ELLIPSIS)))
+
+    def test_linter_durations_recorded_for_scheduling(self):
+        """Durations of each linter are recorded for the next run."""
+        self._enable_result_cache()
+        stamp_directory = os.path.join(os.getcwd(), "stamps")
+
+        def options_modifier(command):
+            """Set the stamp-directory option."""
+            command.stamp_directory = stamp_directory
+
+        self._get_command_output(options_modifier)
+
+        with open(os.path.join(stamp_directory, "timings.json")) as timings:
+            self.assertIn("prospector", json.load(timings))
+
+    def test_durations_kept_only_for_files_in_project(self):
+        """Durations are recorded by relative path, without old files."""
+        self._enable_result_cache()
+        stamp_directory = os.path.join(os.getcwd(), "stamps")
+        os.makedirs(stamp_directory)
+        with open(os.path.join(stamp_directory, "timings.json"),
+                  "w") as timings:
+            json.dump({"prospector": {"deleted.py": 1.0}}, timings)
+
+        def options_modifier(command):
+            """Set the stamp-directory option."""
+            command.stamp_directory = stamp_directory
+
+        self._get_command_output(options_modifier)
+
+        with open(os.path.join(stamp_directory, "timings.json")) as timings:
+            durations = json.load(timings)["prospector"]
+
+        self.assertNotIn("deleted.py", durations)
+        self.assertIn(os.path.join(self._package_name, "module.py"),
+                      durations)
+
+    def test_fail_fast_records_failed_files(self):
+        """Files with messages in fail-fast mode are recorded as failed."""
+        self._enable_result_cache()
+        stamp_directory = os.path.join(os.getcwd(), "stamps")
+
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        def options_modifier(command):
+            """Stop at the first message."""
+            command.stamp_directory = stamp_directory
+            command.fail_fast = 1
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        DocTestMatches("...module.py...", doctest.ELLIPSIS))
+        polysquare_setuptools_lint.command.sys_exit.assert_called_with(1)
+
+        with open(os.path.join(stamp_directory, "failures.json")) as failures:
+            self.assertIn(os.path.realpath(module_file.name),
+                          json.load(failures))
+
+    def test_profile_linters_writes_report(self):
+        """A JSON report of each linter on each file is written."""
+        report_path = os.path.join(os.getcwd(), "profile.json")
+
+        def options_modifier(command):
+            """Profile linters."""
+            command.profile_linters = report_path
+
+        self._get_command_output(options_modifier)
+
+        with open(report_path) as report_file:
+            report = json.load(report_file)
+
+        self.assertIn(("prospector", os.path.join(self._package_name,
+                                                  "module.py")),
+                      [(e["linter"], e["file"]) for e in report["entries"]])
+
+    def test_dont_lint_files_ignored_by_lintignore(self):
+        """Files matched by /.lintignore are not linted."""
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        generated_path = os.path.join(os.getcwd(),
+                                      self._package_name,
+                                      "generated",
+                                      "module.py")
+        with _open_file_force_create(generated_path) as generated_file:
+            generated_file.write("import os\n")
+
+        with open(".lintignore", "w") as lintignore_file:
+            lintignore_file.write("generated/\n*.py\n!setup.py\n"
+                                  "!/{0}/module.py\n".format(
+                                      self._package_name))
+
+        self.assertThat(self._get_command_output(),
+                        MatchesAll(DocTestMatches("...module.py...F401...",
+                                                  doctest.ELLIPSIS),
+                                   Not(DocTestMatches("...generated...",
+                                                      doctest.ELLIPSIS))))
+
+    def test_use_gitignore_excludes_ignored_files(self):
+        """Files matched by /.gitignore are not linted with use_gitignore."""
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        with open(".gitignore", "w") as gitignore_file:
+            gitignore_file.write("/{0}/mod*.py\n".format(self._package_name))
+
+        def options_modifier(command):
+            """Honour /.gitignore."""
+            command.use_gitignore = 1
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        Not(DocTestMatches("...module.py...",
+                                           doctest.ELLIPSIS)))
+
+    def test_dont_lint_files_in_pruned_directories(self):
+        """Files in directories like node_modules are never linted."""
+        readme_path = os.path.join(os.getcwd(),
+                                   "node_modules",
+                                   "dependency",
+                                   "README.md")
+        with _open_file_force_create(readme_path) as readme_file:
+            readme_file.write("Thsi is a mispelled wrod\n")
+
+        self.assertThat(self._get_command_output(),
+                        Not(DocTestMatches("...node_modules...",
+                                           doctest.ELLIPSIS)))
+
+    def test_import_does_not_load_implementation(self):
+        """Importing the module for setup.py loads nothing else."""
+        checkout = os.path.dirname(os.path.dirname(
+            os.path.abspath(polysquare_setuptools_lint.__file__)
+        ))
+        environment = os.environ.copy()
+        environment["PYTHONPATH"] = checkout
+        output = subprocess.check_output([
+            sys.executable,
+            "-c",
+            "import setuptools, sys\n"
+            "before = set(sys.modules.keys())\n"
+            "import polysquare_setuptools_lint\n"
+            "sys.stdout.write(' '.join(set(sys.modules.keys()) - before))\n"
+        ], env=environment)
+
+        self.assertEqual(output.decode("utf-8").split(),
+                         ["polysquare_setuptools_lint"])
+
+    def test_spellcheck_allows_technical_terms_from_code(self):
+        """Symbols used in code are allowed in markdown files."""
+        with self._open_module_file() as module_file:
+            module_file.write("# /package/module.py\n"
+                              "def helper_function_name():\n"
+                              "    pass\n")
+
+        # Each term is on its own line, since only one spelling error
+        # is reported on each line.
+        with open("README.md", "w") as readme_file:
+            readme_file.write("Call helper_function_name.\n\n"
+                              "Not missing_function_name.\n")
+
+        self.assertThat(self._get_command_output(),
+                        MatchesAll(DocTestMatches("...term missing_func...",
+                                                  doctest.ELLIPSIS),
+                                   Not(DocTestMatches("...term helper_func...",
+                                                      doctest.ELLIPSIS))))
+
+    def test_spellcheck_allows_terms_from_files_not_linted(self):
+        """Symbols used in unchanged code are allowed with --changed-since."""
+        with self._open_module_file() as module_file:
+            module_file.write("# /package/module.py\n"
+                              "def helper_function_name():\n"
+                              "    pass\n")
+
+        _git("init")
+        _git("add", ".")
+        _git("-c", "user.name=Test",
+             "-c", "user.email=test@example.com",
+             "commit", "-m", "Initial commit")
+
+        with open("README.md", "w") as readme_file:
+            readme_file.write("Call helper_function_name.\n\n"
+                              "Not missing_function_name.\n")
+
+        def options_modifier(command):
+            """Set the changed-since option."""
+            command.changed_since = "HEAD"
+
+        self.assertThat(self._get_command_output(options_modifier),
+                        MatchesAll(DocTestMatches("...term missing_func...",
+                                                  doctest.ELLIPSIS),
+                                   Not(DocTestMatches("...term helper_func...",
+                                                      doctest.ELLIPSIS))))
+
+    def test_markdown_files_linted_in_batches(self):
+        """Markdown files are split into a batch for each mdl process."""
+        for name in ("first.md", "second.md"):
+            with open(name, "w") as markdown_file:
+                markdown_file.write("Text\n")
+
+        # suppress(protected-access)
+        command = polysquare_setuptools_lint.command
+        scheduler = command._Scheduler(Mock(),
+                                       1,
+                                       command._Timings(None),
+                                       None)
+        batches = scheduler.batches("mdl", ["first.md", "second.md"])
+        self.assertEqual([["first.md"], ["second.md"]], sorted(batches))
+
+    @skipUnless(os.name == "posix", "mdl is replaced by a shell script")
+    def test_markdown_results_cached_per_file(self):
+        """Only markdown files which changed are passed to mdl again."""
+        self._enable_result_cache()
+        os.environ["DISABLE_MULTIPROCESSING"] = "1"
+        self.addCleanup(os.environ.pop, "DISABLE_MULTIPROCESSING")
+
+        log_path = os.path.join(os.getcwd(), "mdl.log")
+        mdl_directory = os.path.join(os.getcwd(), "mdl")
+        os.makedirs(mdl_directory)
+        with open(os.path.join(mdl_directory, "mdl"), "w") as mdl_file:
+            mdl_file.write("#!/bin/sh\n"
+                           "echo \"$#\" >> \"{0}\"\n"
+                           "for f in \"$@\"; do\n"
+                           "    echo \"$f:1: MD041 First line\"\n"
+                           "done\n".format(log_path))
+
+        os.chmod(mdl_file.name, 0o755)
+        self.addCleanup(os.environ.__setitem__, "PATH", os.environ["PATH"])
+        os.environ["PATH"] = os.pathsep.join([mdl_directory,
+                                              os.environ["PATH"]])
+
+        for name in ("first.md", "second.md"):
+            with open(name, "w") as markdown_file:
+                markdown_file.write("Text\n")
+
+        self._get_command_output()
+        with open("second.md", "w") as markdown_file:
+            markdown_file.write("Other text\n")
+
+        self.assertThat(self._get_command_output(),
+                        MatchesAll(DocTestMatches("...first.md...MD041...",
+                                                  doctest.ELLIPSIS),
+                                   DocTestMatches("...second.md...MD041...",
+                                                  doctest.ELLIPSIS)))
+
+        # Both files on the first run, only the changed file after.
+        with open(log_path) as log_file:
+            self.assertEqual(log_file.read().split(), ["2", "1"])
+
+    def test_flake8_style_guide_reused_in_directory(self):
+        """flake8's style guide is made again only for new configuration."""
+        os.environ["DISABLE_MULTIPROCESSING"] = "1"
+        self.addCleanup(os.environ.pop, "DISABLE_MULTIPROCESSING")
+        style_guides = dict()
+        self.patch(polysquare_setuptools_lint.command,
+                   "_FLAKE8_STYLE_GUIDES",
+                   style_guides)
+
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n\nimport os\n")
+
+        self._get_command_output()
+
+        # Messages from the last run are not reported again.
+        with self._open_module_file() as module_file:
+            module_file.write("call('single quotes')\n")
+
+        self.assertThat(self._get_command_output(),
+                        MatchesAll(DocTestMatches("...Q000...",
+                                                  doctest.ELLIPSIS),
+                                   Not(DocTestMatches("...I100...",
+                                                      doctest.ELLIPSIS))))
+        self.assertEqual([os.getcwd()], [d for d, _ in style_guides])
+
+        with open("tox.ini", "w") as tox_ini:
+            tox_ini.write("[tox]\nenvlist=py27\n")
+
+        self._get_command_output()
+        self.assertEqual(2, len(style_guides))
+
+    def _isolate_parsed_files(self):
+        """Give parsed_files a store of its own for this test only."""
+        self.patch(parsed_files, "_FILES", OrderedDict())
+        self.patch(parsed_files, "_GENERATION", [None])
+
+    def test_parsed_files_read_again_in_new_generation(self):
+        """Files are read once in each generation."""
+        self._isolate_parsed_files()
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\n")
+
+        self.assertTrue(parsed_files.reset("first"))
+        parsed = parsed_files.get(module_file.name)
+        self.assertEqual(["import sys\n"], parsed.lines)
+
+        with self._open_module_file() as module_file:
+            module_file.write("import os\n")
+
+        self.assertFalse(parsed_files.reset("first"))
+        self.assertIs(parsed, parsed_files.get(module_file.name))
+
+        self.assertTrue(parsed_files.reset("second"))
+        self.assertEqual(["import os\n"],
+                         parsed_files.get(module_file.name).lines)
+
+    def test_shared_strings_forgotten_in_new_generation(self):
+        """Strings shared between messages last for one generation."""
+        self._isolate_parsed_files()
+
+        # suppress(protected-access)
+        command = polysquare_setuptools_lint.command
+        self.patch(command, "_INTERNED", dict())
+        command._start_generation("first")
+        command._interned("package/module.py")
+        command._start_generation("first")
+        self.assertEqual(["package/module.py"], list(command._INTERNED))
+
+        command._start_generation("second")
+        self.assertEqual(dict(), command._INTERNED)
+
+    def test_least_recently_used_parsed_file_forgotten(self):
+        """The least recently used file is read again past the limit."""
+        self._isolate_parsed_files()
+        self.patch(parsed_files, "_MAX_FILES", 2)
+        filenames = ["first.py", "second.py", "third.py"]
+        for filename in filenames:
+            with open(filename, "w") as python_file:
+                python_file.write("pass\n")
+
+        first = parsed_files.get("first.py")
+        second = parsed_files.get("second.py")
+        self.assertIs(first, parsed_files.get("first.py"))
+        parsed_files.get("third.py")
+
+        self.assertIs(first, parsed_files.get("first.py"))
+        self.assertIsNot(second, parsed_files.get("second.py"))
+
+    def test_prospector_checks_parsed_files(self):
+        """prospector's pep8 and pyflakes check files already parsed."""
+        self._isolate_parsed_files()
+        with self._open_module_file() as module_file:
+            module_file.write("import sys\nvalue=1\n")
+
+        parsed_files.get(module_file.name)
+        with self._open_module_file() as module_file:
+            module_file.write("\"\"\"A module.\"\"\"\n")
+
+        messages = polysquare_setuptools_lint.command._run_prospector_on(
+            [module_file.name],
+            ["pep8", "pyflakes"],
+            []
+        )
+        self.assertEqual(["E225", "F401"],
+                         sorted([m.code for m in messages]))
+
+    def test_pool_workers_discard_pep257_info(self):
+        """Workers start with pep257's info logging silenced."""
+        # suppress(protected-access)
+        pool = polysquare_setuptools_lint.command._create_pool(1)
+        self.addCleanup(pool.join)
+        self.addCleanup(pool.close)
+
+        self.assertTrue(pool.apply(_pep257_info_discarded))
+        self.assertFalse(_pep257_info_discarded())
+
+    def test_failure_to_replace_file_reported(self):
+        """A file which can't be replaced is left alone and reported."""
+        target = os.path.join(os.getcwd(), "target")
+        with _open_file_force_create(os.path.join(target, "inside")):
+            pass
+
+        with capture() as captured:
+            # suppress(protected-access)
+            polysquare_setuptools_lint.command._replace_file(target, b"new")
+            self.assertThat(captured.stderr,
+                            DocTestMatches("Could not replace ...target...",
+                                           doctest.ELLIPSIS))
+
+        self.assertEqual(["__init__.py", "inside"], sorted(os.listdir(target)))